@@ -0,0 +1,415 @@
+"""ASGI variant of the API for many concurrent (long-)polling clients
+
+    uvicorn asgi:app --port 5000 [--workers 4]
+
+Shares the data layer of app.py: the cache, indexes, delta logs and
+pre-rendered response bodies. The polling routes (/api/trains,
+/api/positions, /api/status, /api/stations, /api/stream) are served on the
+event loop from the in-memory cache tier; only cache misses, first renders
+and first compressions go to a thread. `?since=<version>&wait=<seconds>` on
+/api/trains and /api/positions long-polls until the next refresh instead of
+returning an empty delta. Every other /api/* request, and filtered variants
+of the routes above, are handed to the Flask app on a thread pool.
+
+Startup goes through wsgi.create_app, so several uvicorn workers elect one
+refreshing leader exactly like the WSGI deployment.
+"""
+
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl
+
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+import app as app_module
+import wsgi
+from event_stream import Subscriber, format_event
+from metrics import REQUEST_SECONDS
+from response_cache import MIN_COMPRESS_SIZE, SUPPORTED_ENCODINGS
+
+LONG_POLL_MAX_WAIT = 60  # seconds
+THREAD_POOL_SIZE = 32    # cache misses, renders and delegated Flask requests
+
+_executor = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix='asgi')
+
+
+async def run_sync(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+class ChangeNotifier:
+    """Wakes long-polling requests when a DeltaLog records a new version"""
+
+    def __init__(self, log):
+        self.log = log
+        self._event = None
+
+    def attach(self, loop):
+        if self._event is not None:
+            return
+        self._event = asyncio.Event()
+        self.log.add_listener(lambda token: loop.call_soon_threadsafe(self._wake))
+
+    def _wake(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, token, timeout):
+        """Wait until the log moves past `token`; False on timeout"""
+        self.attach(asyncio.get_running_loop())
+        if self.log.token() != token:
+            return True
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class AsyncSubscriber(Subscriber):
+    """Stream subscriber whose queue lives on the event loop
+
+    The broadcaster publishes from refresh threads; messages are handed to
+    the loop, so waiting for them holds no thread.
+    """
+
+    def __init__(self, loop, train_ids=None, bbox=None, maxsize=50, events=('positions',)):
+        super().__init__(train_ids=train_ids, bbox=bbox, maxsize=maxsize, events=events)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def send(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event('resync', {}))
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+trains_notifier = ChangeNotifier(app_module.trains_log)
+positions_notifier = ChangeNotifier(app_module.positions_log)
+
+
+class Request:
+    def __init__(self, scope):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                        for name, value in scope.get('headers', [])}
+
+
+async def send_response(send, status, body=b'', headers=()):
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+               if name.lower() != 'content-length']
+    if status != 304:
+        headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, status, payload):
+    body = app_module.response_cache.serializer.dumps(payload)
+    await send_response(send, status, body, [('Content-Type', 'application/json')])
+
+
+async def load(cache_type, loader):
+    """Cache entry from memory, or from `loader()` in a thread when it has to be loaded or produced"""
+    cache_data = app_module.cache_manager.peek(cache_type)
+    if cache_data is not None:
+        return cache_data, False
+    return await run_sync(loader)
+
+
+async def observe(log, cache_data, observe_snapshot):
+    """Feed a cache entry the delta log has not seen yet (e.g. after an expiry)"""
+    if log.snapshot()[2] is not cache_data:
+        await run_sync(observe_snapshot, cache_data)
+
+
+async def cached_response(request, send, cache_data, key, build_payload, computed=False, max_age=None):
+    """Async counterpart of app.cached_json, producing identical bodies and ETags"""
+    response_cache = app_module.response_cache
+    if computed:
+        cached = await run_sync(response_cache.render, cache_data, f"{key}|fresh", build_payload)
+    else:
+        cached = (response_cache.peek(cache_data, key)
+                  or await run_sync(response_cache.get, cache_data, key, build_payload))
+
+    accept = parse_accept_header(request.headers.get('accept-encoding'))
+    encoding = accept.best_match(SUPPORTED_ENCODINGS)
+    if encoding is None or encoding in cached.variants or len(cached.body) < MIN_COMPRESS_SIZE:
+        body, etag = cached.encoded(encoding)
+    else:
+        body, etag = await run_sync(cached.encoded, encoding)
+
+    headers = [
+        ('ETag', quote_etag(etag)),
+        ('Cache-Control', f"public, max-age={max_age}" if max_age else "no-cache"),
+        ('Vary', 'Accept-Encoding')
+    ]
+    if parse_etags(request.headers.get('if-none-match')).contains_weak(etag):
+        await send_response(send, 304, headers=headers)
+        return
+    headers.append(('Content-Type', 'application/json'))
+    if body is not cached.body:
+        headers.append(('Content-Encoding', encoding))
+    await send_response(send, 200, body, headers)
+
+
+async def wait_for_change(request, notifier):
+    """Long-poll: hold `?since=&wait=` requests until the next version"""
+    since = request.args.get('since')
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        wait = 0
+    if since and wait > 0:
+        await notifier.wait(since, min(wait, LONG_POLL_MAX_WAIT))
+
+
+async def get_trains(request, send):
+    cached_data, computed = await load('trains', app_module.load_trains)
+    await observe(app_module.trains_log, cached_data, app_module.observe_trains)
+    await wait_for_change(request, trains_notifier)
+
+    since = request.args.get('since')
+    if since:
+        delta = app_module.trains_log.changes_since(since)
+        if delta is not None:
+            return await cached_response(request, send, delta['source'],
+                                         app_module.trains_body_key(since), lambda: {
+                "success": True,
+                "full": False,
+                "version": delta['version'],
+                "added": list(delta['added'].values()),
+                "changed": list(delta['changed'].values()),
+                "removed": delta['removed'],
+                "count": delta['count'],
+                "last_updated": delta['source']['last_updated'],
+                "from_cache": not computed
+            }, computed=computed)
+
+    version, trains, source = app_module.trains_log.snapshot()
+    await cached_response(request, send, source, app_module.trains_body_key(), lambda: {
+        "success": True,
+        "full": True,
+        "version": version,
+        "trains": trains,
+        "count": len(trains),
+        "last_updated": source['last_updated'],
+        "from_cache": not computed
+    }, computed=computed)
+
+
+async def get_positions(request, send):
+    cached_positions, computed = await load('positions', app_module.load_positions)
+    await observe(app_module.positions_log, cached_positions, app_module.observe_positions)
+    await wait_for_change(request, positions_notifier)
+
+    since = request.args.get('since')
+    if since:
+        delta = app_module.positions_log.changes_since(since)
+        if delta is not None:
+            return await cached_response(request, send, delta['source'], f"since:{since}", lambda: {
+                "success": True,
+                "full": False,
+                "version": delta['version'],
+                "added": delta['added'],
+                "changed": delta['changed'],
+                "removed": delta['removed'],
+                "count": delta['count'],
+                "last_updated": delta['source']['last_updated']
+            })
+
+    version, _, source = app_module.positions_log.snapshot()
+    await cached_response(request, send, source, "ids:None|bbox:None", lambda: {
+        "success": True,
+        "full": True,
+        "version": version,
+        "positions": source['data'],
+        "count": len(source['data']),
+        "last_updated": source['last_updated']
+    })
+
+
+async def get_status(request, send):
+    cached_status, computed = await load('status', app_module.load_status)
+    await cached_response(request, send, cached_status, "all", lambda: {
+        "success": True,
+        "status": cached_status['data'],
+        "last_updated": cached_status['last_updated']
+    }, computed=computed)
+
+
+async def get_stations(request, send):
+    cached_data, computed = await load(
+        'stations', partial(app_module.cache_manager.get_or_compute, 'stations', app_module.generate_stations))
+    await cached_response(request, send, cached_data, "all", lambda: {
+        "success": True,
+        "stations": cached_data['data'],
+        "last_updated": cached_data['last_updated']
+    }, computed=computed, max_age=app_module.STATIONS_MAX_AGE)
+
+
+async def stream_positions(request, send):
+    ids = request.args.get('ids')
+    try:
+        bbox = app_module.parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        events = app_module.parse_stream_events(request.args.get('events'))
+    except ValueError as e:
+        return await send_json(send, 400, {"success": False, "error": f"Invalid stream filter: {e}"})
+
+    subscriber = app_module.broadcaster.add(AsyncSubscriber(
+        asyncio.get_running_loop(), train_ids=ids.split(',') if ids else None, bbox=bbox,
+        events=events))
+    try:
+        chunks = ["retry: 5000\n\n"]
+        if 'positions' in events:
+            cached_positions, computed = await load('positions', app_module.load_positions)
+            await observe(app_module.positions_log, cached_positions, app_module.observe_positions)
+            version, _, snapshot = app_module.positions_log.snapshot()
+            initial, _ = subscriber.select(list(snapshot['data'].values()))
+            chunks.append(format_event('snapshot', {'version': version, 'updates': initial},
+                                       event_id=version))
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+        while True:
+            await send({'type': 'http.response.body', 'body': ''.join(chunks).encode('utf-8'),
+                        'more_body': True})
+            message = await subscriber.get(timeout=app_module.STREAM_HEARTBEAT)
+            chunks = [message if message is not None else ": keep-alive\n\n"]
+    except OSError:
+        pass  # client went away
+    finally:
+        app_module.broadcaster.unsubscribe(subscriber)
+
+
+def _native_route(request):
+    """Handler for requests served on the event loop, or None to delegate to Flask"""
+    if request.method != 'GET':
+        return None
+    args = set(request.args)
+    if request.path == '/api/trains' and args <= {'since', 'wait'}:
+        return get_trains
+    if request.path == '/api/positions' and args <= {'since', 'wait'}:
+        return get_positions
+    if request.path == '/api/status':
+        return get_status
+    if request.path == '/api/stations':
+        return get_stations
+    if request.path == '/api/stream':
+        return stream_positions
+    return None
+
+
+async def call_flask(scope, receive, send):
+    """Run a request through the Flask app on the thread pool"""
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+
+    def run():
+        result = app_module.app.wsgi_app(environ, start_response)
+        try:
+            return b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    body = await run_sync(run)
+    await send_response(send, response['status'], body, response['headers'])
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            loop = asyncio.get_running_loop()
+            trains_notifier.attach(loop)
+            positions_notifier.attach(loop)
+            # Elects the refreshing worker and populates the cache
+            await run_sync(wsgi.create_app)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    request = Request(scope)
+    handler = _native_route(request)
+    if handler is None:
+        # Timed by the Flask request hooks
+        return await call_flask(scope, receive, send)
+
+    started = time.perf_counter()
+
+    async def timed_send(message):
+        if message['type'] == 'http.response.start':
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route=request.path,
+                                    method=request.method, status=message['status'])
+        await send(message)
+
+    await handler(request, timed_send)
@@ -0,0 +1,169 @@
+"""Latency of the Flask (threaded WSGI) and ASGI apps under many open connections
+
+Each server runs in its own process and fresh cache directory; an asyncio
+client keeps `--connections` HTTP/1.1 keep-alive connections busy polling
+the hot routes and reports latency percentiles. The werkzeug server closes
+every connection after a response, so its latencies include reconnecting.
+The ASGI run needs uvicorn.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_asgi [--servers flask,asgi] [--connections 1000] [--duration 10] [--trains 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ['/api/trains', '/api/positions', '/api/status', '/api/stations']
+REQUEST_TIMEOUT = 30  # seconds
+
+
+def serve(server, port, trains):
+    import logging
+    import app as app_module
+    from benchmarks.fleet import generate_records
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app_module.trains_data[:] = generate_records(trains)
+    if server == 'flask':
+        from werkzeug.serving import make_server
+        import wsgi
+        wsgi.create_app()
+        make_server('127.0.0.1', port, app_module.app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        uvicorn.run('asgi:app', host='127.0.0.1', port=port, log_level='error', backlog=4096)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _request(reader, writer, path):
+    """One GET; returns the status code and whether the connection stays open"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept-Encoding: gzip\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(lines[0].split(' ', 2)[1]), headers.get('connection', '').lower() != 'close'
+
+
+async def _connection(port, deadline, offset, latencies, errors):
+    """Keep one client connection busy; reconnect time counts towards latency"""
+    i = offset
+    connection = None
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection('127.0.0.1', port)
+            status, keep_alive = await asyncio.wait_for(
+                _request(*connection, PATHS[i % len(PATHS)]), REQUEST_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+            status, keep_alive = None, False
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(status)
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+        i += 1
+    if connection is not None:
+        connection[1].close()
+
+
+async def _drive(port, connections, duration):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(_connection(port, deadline, i, latencies, errors)
+                           for i in range(connections)))
+    return sorted(latencies), len(errors)
+
+
+def _wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def run(server, connections, duration, trains):
+    port = _free_port()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=backend_dir)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_asgi', '--serve', server,
+         '--port', str(port), '--trains', str(trains)],
+        cwd=tempfile.mkdtemp(prefix='bench-asgi-'), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port)
+        latencies, errors = asyncio.run(_drive(port, connections, duration))
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        'rps': len(latencies) / duration,
+        'p50': _percentile(latencies, 50) * 1000,
+        'p95': _percentile(latencies, 95) * 1000,
+        'p99': _percentile(latencies, 99) * 1000,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default='flask,asgi')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--trains', type=int, default=2000)
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.trains)
+        return
+
+    print(f"{args.trains} trains, {args.connections} connections, {args.duration}s per run, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'server':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for server in args.servers.split(','):
+        if server == 'asgi':
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                print(f"{server:>6} skipped: pip install uvicorn")
+                continue
+        result = run(server, args.connections, args.duration, args.trains)
+        print(f"{server:>6} {result['rps']:>9.1f} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+              f"{result['p99']:>8.2f} {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Rows/s for history inserts: per-row insert and commit vs. batched HistoryWriter
+
+The per-row case mirrors proxy.php / save_train_data.php, which open a
+connection and commit a single row per call.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_history_writer [--trains 2000] [--snapshots 5] [--batch 1000]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.fleet import generate_fleet
+from history_writer import SQLITE_SCHEMA, HistoryWriter, rows_from_trains, sqlite_pool
+
+
+def per_row(path, position_rows, train_rows):
+    for table, rows in (('positions', position_rows), ('trains', train_rows)):
+        placeholders = ', '.join(['?'] * len(rows[0]))
+        for row in rows:
+            conn = sqlite3.connect(path)
+            # The PHP scripts insert without the autoincrement id column
+            conn.execute(f"INSERT INTO {table} VALUES (NULL, {placeholders})", row)
+            conn.commit()
+            conn.close()
+
+
+def batched(path, position_rows, train_rows, batch):
+    writer = HistoryWriter(sqlite_pool(path), flush_size=batch)
+    for start in range(0, len(position_rows), batch):
+        writer.record_positions(position_rows[start:start + batch])
+        writer.record_trains(train_rows[start:start + batch])
+        writer.flush()
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trains', type=int, default=2000)
+    parser.add_argument('--snapshots', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    fleet = generate_fleet(args.trains)
+    position_rows, train_rows = [], []
+    for i in range(args.snapshots):
+        positions, trains = rows_from_trains(fleet, f"2024-01-01 12:00:{i:02d}")
+        position_rows += positions
+        train_rows += trains
+    total = len(position_rows) + len(train_rows)
+
+    workdir = tempfile.mkdtemp(prefix='bench-history-')
+    cases = [
+        ('per-row commit', lambda path: per_row(path, position_rows, train_rows)),
+        (f'batched ({args.batch})', lambda path: batched(path, position_rows, train_rows, args.batch)),
+    ]
+
+    print(f"{total} rows ({args.trains} trains x {args.snapshots} snapshots, 2 tables), SQLite")
+    print(f"{'case':<22} {'rows/s':>12}")
+    for name, func in cases:
+        path = os.path.join(workdir, f"{name.split()[0]}.db")
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SQLITE_SCHEMA)
+        conn.close()
+
+        start = time.perf_counter()
+        func(path)
+        elapsed = time.perf_counter() - start
+
+        conn = sqlite3.connect(path)
+        stored = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                     for table in ('positions', 'trains'))
+        conn.close()
+        assert stored == total, f"{name}: stored {stored} of {total} rows"
+        print(f"{name:<22} {total / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
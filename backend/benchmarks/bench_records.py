@@ -0,0 +1,108 @@
+"""Memory per train and refresh time of train records versus train dicts
+
+The base fleet is loaded from a JSON cache file, as on a cold start, so no
+strings are shared that a real feed would not share. The dict model is the
+one the app used before train records: a `train.copy()` plus a new position
+dict per train and refresh. Refresh time covers the simulated snapshot, the
+cache file serialization and the per-snapshot indexes.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_records [--trains 50000] [--rounds 3]
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from producers import simulate_trains
+from serializers import get_serializer
+from timetable import Timetable
+from train_records import TrainRecord
+from train_store import TrainStore
+from benchmarks.fleet import generate_fleet
+
+
+def simulate_dicts(trains):
+    """The dict-based simulation train records replaced"""
+    updated_trains = []
+    for train in trains:
+        updated_train = train.copy()
+        updated_train['position'] = {
+            'lat': train['position']['lat'] + random.uniform(-0.005, 0.005),
+            'lng': train['position']['lng'] + random.uniform(-0.005, 0.005)
+        }
+        if random.random() < 0.1:
+            updated_train['delay_minutes'] = max(0, train['delay_minutes'] + random.randint(-2, 3))
+        updated_trains.append(updated_train)
+    return updated_trains
+
+
+def _traced(func):
+    """(result, bytes allocated by func and still alive afterwards)"""
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def _best(func, rounds):
+    best, result = float('inf'), None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_model(name, load, simulate, raw, rounds, serializer):
+    base, base_bytes = _traced(lambda: load(raw))
+    snapshot, snapshot_bytes = _traced(lambda: simulate(base))
+    count = len(base)
+
+    stages = {
+        'simulate': _best(lambda: simulate(base), rounds)[0],
+        'serialize': _best(lambda: serializer.dumps({'data': snapshot}), rounds)[0],
+        'store': _best(lambda: TrainStore(snapshot), rounds)[0],
+        'timetable': _best(lambda: Timetable(snapshot), rounds)[0],
+    }
+    return {
+        'model': name,
+        'base_bytes': base_bytes / count,
+        'snapshot_bytes': snapshot_bytes / count,
+        'stages': stages,
+        'refresh': sum(stages.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trains', type=int, default=50000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    raw = json.dumps(generate_fleet(args.trains))
+    serializer = get_serializer()
+    results = [
+        bench_model('dict', json.loads, simulate_dicts, raw, args.rounds, serializer),
+        bench_model('record', lambda raw: [TrainRecord.from_dict(train) for train in json.loads(raw)],
+                    simulate_trains, raw, args.rounds, serializer),
+    ]
+
+    stage_names = list(results[0]['stages'])
+    print(f"{args.trains} trains, best of {args.rounds} rounds, {serializer.name} serializer")
+    print(f"{'model':<8} {'base B/train':>13} {'snapshot B/train':>17} "
+          + ' '.join(f"{name + ' ms':>13}" for name in stage_names) + f" {'refresh ms':>11}")
+    for result in results:
+        print(f"{result['model']:<8} {result['base_bytes']:>13.0f} {result['snapshot_bytes']:>17.0f} "
+              + ' '.join(f"{result['stages'][name] * 1000:>13.1f}" for name in stage_names)
+              + f" {result['refresh'] * 1000:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
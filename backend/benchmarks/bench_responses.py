@@ -0,0 +1,70 @@
+"""Requests/s for /api/trains: per-request jsonify vs. pre-serialized bodies
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_responses [--trains 5000] [--requests 200]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+
+def _requests_per_second(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trains', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    # The app creates its cache directory relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix='bench-responses-'))
+    import app as app_module
+    from flask import jsonify
+    from benchmarks.fleet import generate_records
+    from response_cache import SUPPORTED_ENCODINGS
+
+    app_module.trains_data[:] = generate_records(args.trains)
+    app_module.refresh_all_cache()
+    client = app_module.app.test_client()
+    cached = app_module.cache_manager.get_cached_data('trains')
+
+    def legacy_jsonify():
+        # What every /api/trains hit used to cost
+        with app_module.app.test_request_context('/api/trains'):
+            response = jsonify({
+                "success": True,
+                "trains": cached['data'],
+                "count": len(cached['data']),
+                "last_updated": cached['last_updated'],
+                "from_cache": True
+            })
+            response.get_data()
+
+    def fetch(headers):
+        return lambda: client.get('/api/trains', headers=headers).get_data()
+
+    cases = [('jsonify per request', legacy_jsonify, None), ('cached identity', None, {})]
+    cases += [(f'cached {encoding}', None, {'Accept-Encoding': encoding})
+              for encoding in SUPPORTED_ENCODINGS]
+
+    print(f"/api/trains with {args.trains} trains, {args.requests} requests per case")
+    print(f"{'case':<22} {'req/s':>9} {'body KiB':>10}")
+    for name, func, headers in cases:
+        size = '-'
+        if func is None:
+            func = fetch(headers)
+            size = f"{len(func()) / 1024:.1f}"  # also renders and compresses once
+        func()
+        rps = _requests_per_second(func, args.requests)
+        print(f"{name:<22} {rps:>9.1f} {size:>10}")
+
+
+if __name__ == '__main__':
+    main()
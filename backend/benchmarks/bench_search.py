@@ -0,0 +1,54 @@
+"""Search index vs. linear scan at fleet scale
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_search [--trains 10000] [--rounds 200]
+"""
+
+import argparse
+import time
+
+from search_index import SearchIndex
+from benchmarks.fleet import generate_fleet
+
+QUERIES = ['b', 'sz', 'deb', 'pusp', 'ic000', 'IC00042', 'budapest-keleti', 'nyír', 'xyz']
+FIELDS = ('name', 'id', 'from_station', 'to_station', 'current_station')
+
+
+def linear_search(trains, query):
+    """The original /api/search implementation"""
+    query = query.lower()
+    return [t for t in trains if any(query in t[field].lower() for field in FIELDS)]
+
+
+def _per_query_us(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trains', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    trains = generate_fleet(args.trains)
+
+    start = time.perf_counter()
+    index = SearchIndex(trains)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"{args.trains} trains, index built in {build_ms:.1f} ms "
+          f"({len(index.terms)} terms, {len(index.grams)} n-grams)")
+
+    print(f"{'query':<18} {'matches':>8} {'linear µs':>11} {'index µs':>10} {'speedup':>8}")
+    for query in QUERIES:
+        _, total = index.search(query, limit=args.limit)
+        linear_us = _per_query_us(lambda: linear_search(trains, query), max(args.rounds // 10, 1))
+        index_us = _per_query_us(lambda: index.search(query, limit=args.limit), args.rounds)
+        print(f"{query:<18} {total:>8} {linear_us:>11.1f} {index_us:>10.1f} {linear_us / index_us:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
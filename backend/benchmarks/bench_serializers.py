@@ -0,0 +1,78 @@
+"""Write/read latency of the cache serializers
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serializers [--trains 5000] [--rounds 20]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from cache_manager import CacheManager
+from serializers import available_serializers
+from benchmarks.fleet import generate_fleet
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def bench_serializer(name, trains, positions, rounds):
+    cache_dir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        manager = CacheManager(cache_dir, serializer=name)
+        write_times, read_times = [], []
+
+        for _ in range(rounds):
+            start = time.perf_counter()
+            manager.update_cache('trains', trains)
+            manager.update_cache('positions', positions)
+            write_times.append(time.perf_counter() - start)
+
+            # Drop the memory tier so the read really hits the disk
+            manager._memory.clear()
+            start = time.perf_counter()
+            manager.get_cached_data('trains')
+            manager.get_cached_data('positions')
+            read_times.append(time.perf_counter() - start)
+
+        size = sum(
+            os.path.getsize(manager._get_cache_path(cache_type))
+            for cache_type in ('trains', 'positions')
+        )
+        return _median(write_times), _median(read_times), size
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trains', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    trains = generate_fleet(args.trains)
+    positions = {
+        t['id']: {
+            'success': True,
+            'train_id': t['id'],
+            'position': t['position'],
+            'current_station': t['current_station'],
+            'status': t['status'],
+            'delay_minutes': t['delay_minutes'],
+        }
+        for t in trains
+    }
+
+    print(f"{args.trains} trains, {args.rounds} rounds (median, trains + positions)")
+    print(f"{'serializer':<12} {'write ms':>10} {'read ms':>10} {'size KiB':>10}")
+    for name in available_serializers():
+        write_s, read_s, size = bench_serializer(name, trains, positions, args.rounds)
+        print(f"{name:<12} {write_s * 1000:>10.2f} {read_s * 1000:>10.2f} {size / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
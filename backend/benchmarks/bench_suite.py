@@ -0,0 +1,320 @@
+"""Load tests of every read endpoint plus CacheManager microbenchmarks
+
+For each fleet size the app is populated with a synthetic fleet and served
+in-process by a threaded werkzeug server; `--concurrency` client threads
+send a fixed number of requests per endpoint and the run reports req/s and
+latency percentiles. Background refreshes are off and the cache does not
+expire during a run, so results only depend on the code and the machine.
+Client threads share the interpreter with the server: compare runs made
+with the same settings on the same machine.
+
+Results are printed as a table and, with --output, written as JSON that
+--compare diffs against a run from another commit.
+
+The history endpoints are loaded against a few snapshots recorded into a
+temporary HISTORY_DIR. Endpoints whose warm-up only gets errors are
+skipped rather than reported.
+
+Usage (from the backend directory; the scripts import `benchmarks.*` and the
+backend modules, so run them with -m, not as `python benchmarks/bench_suite.py`):
+    python -m benchmarks.bench_suite [--trains 1000,10000,50000] [--concurrency 8] [--requests 200] [--output results.json]
+    python -m benchmarks.bench_suite --compare before.json after.json
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote
+
+# Routes left out of the load test: streams and cache-mutating endpoints
+SKIPPED_ROUTES = {'/api/stream', '/api/cache/clear', '/api/cache/refresh'}
+SAMPLE_IDS = 100  # distinct trains/stations rotated through per endpoint
+HISTORY_SNAPSHOTS = 5  # trains snapshots recorded before the history endpoints are loaded
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def _summary(latencies, elapsed, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 3) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+    }
+
+
+def scenarios(fleet, version):
+    """(name, route rule, list of request paths) for every endpoint under test"""
+    sample = fleet[:: max(1, len(fleet) // SAMPLE_IDS)][:SAMPLE_IDS]
+    ids = [train['id'] for train in sample]
+    stations = sorted({train['current_station'] for train in sample})
+    return [
+        ('trains', '/api/trains', ['/api/trains']),
+        ('trains?since', '/api/trains', [f'/api/trains?since={version}']),
+        ('trains?status', '/api/trains', ['/api/trains?status=delayed']),
+        ('trains?station', '/api/trains',
+         [f'/api/trains?station={quote(station)}' for station in stations]),
+        ('trains?limit&fields', '/api/trains', ['/api/trains?limit=50&fields=id,name,status,delay_minutes']),
+        ('trains?sort=delay', '/api/trains', ['/api/trains?sort=delay&limit=50']),
+        ('trains?bbox', '/api/trains', ['/api/trains?bbox=18.9,47.3,19.3,47.7']),
+        ('trains?clusters', '/api/trains', ['/api/trains?bbox=16,45.7,22.9,48.6&zoom=7']),
+        ('trains/nearby', '/api/trains/nearby', ['/api/trains/nearby?lat=47.5&lng=19.05&radius=20']),
+        ('trains/<id>', '/api/trains/<train_id>', [f'/api/trains/{i}' for i in ids]),
+        ('trains/<id>/position', '/api/trains/<train_id>/position',
+         [f'/api/trains/{i}/position' for i in ids]),
+        ('trains/<id>/history', '/api/trains/<train_id>/history',
+         [f'/api/trains/{i}/history' for i in ids]),
+        ('positions', '/api/positions', ['/api/positions']),
+        ('positions?ids', '/api/positions', [f"/api/positions?ids={','.join(ids[:20])}"]),
+        ('positions.bin', '/api/positions.bin', ['/api/positions.bin']),
+        ('positions.ids', '/api/positions.ids', ['/api/positions.ids']),
+        ('stations', '/api/stations', ['/api/stations']),
+        ('stations/<name>/departures', '/api/stations/<path:name>/departures',
+         [f'/api/stations/{quote(station)}/departures' for station in stations]),
+        ('stations/<name>/board', '/api/stations/<path:name>/board',
+         [f'/api/stations/{quote(station)}/board?window=120' for station in stations]),
+        ('search', '/api/search', [f'/api/search?q={quote(q)}' for q in ('IC', 'Deb', 'szeged', 'S000')]),
+        ('status', '/api/status', ['/api/status']),
+        ('stats/delays', '/api/stats/delays', ['/api/stats/delays']),
+        ('cache/info', '/api/cache/info', ['/api/cache/info']),
+        ('metrics', '/api/metrics', ['/api/metrics']),
+    ]
+
+
+def _load(port, paths, total, concurrency):
+    """Send `total` GETs spread over `concurrency` threads; returns the summary"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        local, failed = [], 0
+        conn = None
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('GET', paths[i % len(paths)], headers={'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+                if response.will_close:
+                    conn.close()
+                    conn = None
+            except OSError:
+                ok = False
+                conn = None
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    return _summary(latencies, time.perf_counter() - started, errors[0])
+
+
+def _time_ops(func, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'ops': count,
+        'ops_per_s': round(count / sum(latencies), 1),
+        'mean_us': round(statistics.fmean(latencies) * 1e6, 2),
+        'p50_us': round(_percentile(latencies, 50) * 1e6, 2),
+        'p99_us': round(_percentile(latencies, 99) * 1e6, 2),
+    }
+
+
+def cache_microbenchmarks(fleet, count):
+    """Read and write paths of a CacheManager holding `fleet` as its trains entry"""
+    from cache_manager import CacheManager
+
+    manager = CacheManager(cache_dir=tempfile.mkdtemp(prefix='bench-cache-'))
+    manager.cache_expiry = dict.fromkeys(manager.cache_files, float('inf'))
+    manager.update_cache('trains', fleet)
+    serialized = manager.serializer.dumps(manager.get_cached_data('trains'))
+    slow = max(1, count // 20)  # full (de)serializations of the fleet
+
+    def cold_read():
+        manager._forget('trains')
+        manager._read_cache('trains')
+
+    return {
+        'serializer': manager.serializer.name,
+        'entry_bytes': len(serialized),
+        'peek': _time_ops(lambda: manager.peek('trains'), count),
+        'get_cached_data': _time_ops(lambda: manager.get_cached_data('trains'), count),
+        'get_or_compute_hit': _time_ops(lambda: manager.get_or_compute('trains', list), count),
+        'read_from_disk': _time_ops(cold_read, slow),
+        'write': _time_ops(lambda: manager.update_cache('trains', fleet), slow),
+        'dumps': _time_ops(lambda: manager.serializer.dumps({'data': fleet}), slow),
+        'loads': _time_ops(lambda: manager.serializer.loads(serialized), slow),
+    }
+
+
+def run_suite(sizes, concurrency, requests, micro_ops):
+    # The app creates its cache directory relative to the working directory;
+    # the history store (opt-in) goes next to it
+    workdir = tempfile.mkdtemp(prefix='bench-suite-')
+    os.chdir(workdir)
+    os.environ['HISTORY_DIR'] = os.path.join(workdir, 'history')
+    logging.disable(logging.INFO)
+    import app as app_module
+    from werkzeug.serving import make_server
+    from benchmarks.fleet import generate_records
+
+    app_module.cache_manager.cache_expiry = dict.fromkeys(app_module.cache_manager.cache_files, float('inf'))
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    covered = set()
+    results = []
+    try:
+        for size in sizes:
+            fleet = generate_records(size)
+            app_module.trains_data[:] = fleet
+            app_module.refresh_all_cache()
+            version = app_module.trains_log.token()
+            # Every trains snapshot is recorded, so the history endpoints have samples
+            for _ in range(HISTORY_SNAPSHOTS - 1):
+                app_module.refresh_trains()
+
+            endpoints = {}
+            for name, rule, paths in scenarios(fleet, version):
+                covered.add(rule)
+                warm_up = _load(server.port, paths, min(requests, 20), concurrency)
+                if warm_up['errors'] == warm_up['requests']:
+                    # No numbers for error responses
+                    print(f"{size:>6} {name:<27} skipped: every request failed", file=sys.stderr)
+                    continue
+                endpoints[name] = _load(server.port, paths, requests, concurrency)
+                print(_format_row(size, name, endpoints[name]), file=sys.stderr)
+            results.append({
+                'trains': size,
+                'endpoints': endpoints,
+                'cache_manager': cache_microbenchmarks(fleet, micro_ops),
+            })
+    finally:
+        server.shutdown()
+
+    routes = {rule.rule for rule in app_module.app.url_map.iter_rules()
+              if rule.rule.startswith('/api/') and 'GET' in rule.methods}
+    return results, sorted(routes - covered - SKIPPED_ROUTES)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_row(size, name, result):
+    def ms(value):
+        return f"{value:>8.2f}" if value is not None else f"{'-':>8}"
+    return (f"{size:>6} {name:<27} {result['rps'] or 0:>9.1f} {ms(result['p50_ms'])} "
+            f"{ms(result['p95_ms'])} {ms(result['p99_ms'])} {result['errors']:>6}")
+
+
+def compare(before_path, after_path):
+    """Print the change of req/s, p99 and microbenchmark ops/s between two result files"""
+    with open(before_path) as f:
+        before = {run['trains']: run for run in json.load(f)['runs']}
+    with open(after_path) as f:
+        after = {run['trains']: run for run in json.load(f)['runs']}
+
+    def change(old, new):
+        if not old or new is None:
+            return f"{'-':>8}"
+        return f"{(new - old) / old * 100:>+7.1f}%"
+
+    print(f"{'trains':>6} {'benchmark':<27} {'req/s':>8} {'p99':>8}")
+    for size in sorted(before.keys() & after.keys()):
+        old, new = before[size], after[size]
+        for name, a in old['endpoints'].items():
+            b = new['endpoints'].get(name)
+            if b is None:
+                continue
+            print(f"{size:>6} {name:<27} {change(a['rps'], b['rps'])} "
+                  f"{change(a['p99_ms'], b['p99_ms'])}")
+        for name, a in old['cache_manager'].items():
+            b = new['cache_manager'].get(name)
+            if isinstance(a, dict) and isinstance(b, dict):
+                print(f"{size:>6} {'cache.' + name:<27} {change(a['ops_per_s'], b['ops_per_s'])} "
+                      f"{change(a['p99_us'], b['p99_us'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trains', default='1000,10000')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--micro-ops', type=int, default=2000, help='CacheManager operations')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    output = os.path.abspath(args.output) if args.output else None
+    sizes = [int(size) for size in args.trains.split(',')]
+    print(f"{'trains':>6} {'endpoint':<27} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>6}", file=sys.stderr)
+    runs, uncovered = run_suite(sizes, args.concurrency, args.requests, args.micro_ops)
+    if uncovered:
+        print(f"Not load tested: {', '.join(uncovered)}", file=sys.stderr)
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': {'concurrency': args.concurrency, 'requests': args.requests,
+                     'micro_ops': args.micro_ops},
+        'runs': runs,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
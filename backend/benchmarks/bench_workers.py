@@ -0,0 +1,169 @@
+"""Throughput of the WSGI app with several worker processes sharing one cache
+
+Each run starts a pre-fork server (one listening socket, N forked workers
+configured by wsgi.create_app, like gunicorn sync workers) in a fresh cache
+directory and drives it from several client processes. Scaling needs at
+least as many free CPU cores as workers plus clients.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--clients 8] [--duration 5] [--trains 2000]
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ['/api/trains', '/api/trains?status=delayed', '/api/status', '/api/stations']
+
+
+def serve(workers, port, trains):
+    """Pre-fork server: bind once, fork `workers` processes that share the socket"""
+    import logging
+    from werkzeug.serving import make_server
+    import app as app_module
+    import wsgi
+    from benchmarks.fleet import generate_records
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app_module.trains_data[:] = generate_records(trains)
+    server = make_server('127.0.0.1', port, app_module.app)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                wsgi.create_app()
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def shutdown(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if _get(port, '/api/status') == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _client(args):
+    port, duration, offset = args
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    i = offset
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            status = _get(port, PATHS[i % len(PATHS)])
+        except OSError:
+            status = None
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+        i += 1
+    return latencies, errors
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def run(workers, clients, duration, trains):
+    port = _free_port()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=backend_dir)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_workers', '--serve', str(workers),
+         '--port', str(port), '--trains', str(trains)],
+        cwd=tempfile.mkdtemp(prefix='bench-workers-'), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port)
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(_client, [(port, duration, i) for i in range(clients)])
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    return {
+        'rps': len(latencies) / duration,
+        'p50': _percentile(latencies, 50) * 1000,
+        'p99': _percentile(latencies, 99) * 1000,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--trains', type=int, default=2000)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.trains)
+        return
+
+    print(f"{args.trains} trains, {args.clients} client processes, {args.duration}s per run, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        result = run(workers, args.clients, args.duration, args.trains)
+        print(f"{workers:>7} {result['rps']:>9.1f} {result['p50']:>8.2f} {result['p99']:>8.2f} "
+              f"{result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
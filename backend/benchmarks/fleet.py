@@ -0,0 +1,106 @@
+"""Synthetic fleet generator for benchmarks
+
+Produces trains in the same shape as the mock `trains_data` in app.py, with
+routes drawn from real Hungarian stations.
+"""
+
+import random
+
+from train_records import TrainRecord
+
+STATIONS = [
+    ("Budapest-Keleti", 47.5003, 19.0840),
+    ("Budapest-Nyugati", 47.5106, 19.0569),
+    ("Budapest-Déli", 47.5004, 19.0247),
+    ("Cegléd", 47.1726, 19.7995),
+    ("Szolnok", 47.1833, 20.2000),
+    ("Püspökladány", 47.3183, 21.1146),
+    ("Debrecen", 47.5194, 21.6287),
+    ("Nyíregyháza", 47.9527, 21.7270),
+    ("Miskolc-Tiszai", 48.0964, 20.8040),
+    ("Hatvan", 47.6660, 19.6704),
+    ("Székesfehérvár", 47.1885, 18.4114),
+    ("Siófok", 46.9083, 18.0500),
+    ("Kaposvár", 46.3594, 17.7968),
+    ("Pécs", 46.0727, 18.2323),
+    ("Dombóvár", 46.3770, 18.1310),
+    ("Kecskemét", 46.9073, 19.6908),
+    ("Kiskunfélegyháza", 46.7120, 19.8500),
+    ("Szeged", 46.2530, 20.1414),
+    ("Békéscsaba", 46.6736, 21.0877),
+    ("Győr", 47.6833, 17.6351),
+    ("Tatabánya", 47.5692, 18.4048),
+    ("Sopron", 47.6817, 16.5845),
+    ("Szombathely", 47.2307, 16.6218),
+    ("Veszprém", 47.0930, 17.9110),
+    ("Zalaegerszeg", 46.8417, 16.8416),
+    ("Nagykanizsa", 46.4535, 16.9910),
+    ("Eger", 47.9025, 20.3772),
+    ("Vác", 47.7750, 19.1361),
+    ("Esztergom", 47.7928, 18.7403),
+    ("Záhony", 48.4094, 22.1761),
+]
+
+TRAIN_TYPES = [
+    ("IC", "InterCity"),
+    ("S", "Sebesvonat"),
+    ("R", "Regionális"),
+    ("G", "Gyorsvonat"),
+]
+
+
+def _fmt(minutes):
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_train(index, rng):
+    """Generate a single synthetic train"""
+    prefix, train_type = TRAIN_TYPES[index % len(TRAIN_TYPES)]
+    stops = rng.sample(STATIONS, rng.randint(3, 8))
+    current = rng.randrange(len(stops))
+    start = rng.randint(4 * 60, 22 * 60)
+
+    route = []
+    minute = start
+    for i, (station, _, _) in enumerate(stops):
+        if i < current:
+            stop_status = "departed"
+        elif i == current:
+            stop_status = "current"
+        else:
+            stop_status = "upcoming"
+        route.append({"station": station, "time": _fmt(minute), "status": stop_status})
+        minute += rng.randint(15, 50)
+
+    delay = rng.choice([0, 0, 0, 0, 2, 5, 12, 25])
+    _, lat, lng = stops[current]
+
+    return {
+        "id": f"{prefix}{index:05d}",
+        "name": f"{train_type} {stops[0][0]}-{stops[-1][0]}",
+        "type": train_type,
+        "from_station": stops[0][0],
+        "to_station": stops[-1][0],
+        "departure_time": route[0]["time"],
+        "arrival_time": route[-1]["time"],
+        "current_station": stops[current][0],
+        "delay_minutes": delay,
+        "status": "delayed" if delay > 10 else "running",
+        "position": {
+            "lat": lat + rng.uniform(-0.05, 0.05),
+            "lng": lng + rng.uniform(-0.05, 0.05),
+        },
+        "route": route,
+    }
+
+
+def generate_fleet(size, seed=42):
+    """Generate `size` synthetic trains, deterministic for a given seed"""
+    rng = random.Random(seed)
+    return [generate_train(i, rng) for i in range(size)]
+
+
+def generate_records(size, seed=42):
+    """`generate_fleet` as train records, the in-memory form the app keeps"""
+    return [TrainRecord.from_dict(train) for train in generate_fleet(size, seed)]
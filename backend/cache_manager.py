@@ -1,21 +1,51 @@
-import json
+import logging
 import os
+import tempfile
 from datetime import datetime, timedelta
 import threading
-import time
+
+from metrics import CACHE_DISK_SECONDS, CACHE_REQUESTS, CACHE_SERIALIZE_SECONDS
+from serializers import get_serializer
+
+logger = logging.getLogger(__name__)
 
 class CacheManager:
-    def __init__(self, cache_dir="cache"):
+    def __init__(self, cache_dir="cache", serializer="auto", channel=None):
         self.cache_dir = cache_dir
+        self.serializer = get_serializer(serializer)
+        ext = self.serializer.extension
         self.cache_files = {
-            'trains': 'trains.json',
-            'stations': 'stations.json', 
-            'status': 'status.json',
-            'positions': 'positions.json'
+            'trains': f'trains{ext}',
+            'stations': f'stations{ext}', 
+            'status': f'status{ext}',
+            'positions': f'positions{ext}'
         }
-        self.cache_expiry = 30  # seconds
+        # Seconds an entry stays fresh, per cache type; the app derives them
+        # from its refresh intervals
+        self.cache_expiry = dict.fromkeys(self.cache_files, 30)
         self.last_update = {}
         
+        # In-memory tier: parsed cache entries keyed by cache type, together
+        # with the file signature (mtime, inode, size) they were loaded from
+        self._memory = {}
+        self._generation = {cache_type: 0 for cache_type in self.cache_files}
+        self._memory_lock = threading.RLock()
+        
+        # One lock per cache type so only a single caller regenerates it
+        self._compute_locks = {cache_type: threading.Lock() for cache_type in self.cache_files}
+        
+        # Derived views (indexes, pre-rendered bodies...) keyed by
+        # (cache_type, name) -> (cache entry they were built from, view)
+        self._views = {}
+        self._view_locks = {}
+        
+        # Multi-worker deployments: `channel` carries per-type generation
+        # counters between processes (see shared_snapshot.py), and read-only
+        # workers serve what the refreshing worker published instead of
+        # running producers themselves.
+        self.channel = channel
+        self.read_only = False
+        
         # Create cache directory if it doesn't exist
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
@@ -24,56 +54,145 @@ class CacheManager:
         self._init_cache_files()
         
     def _init_cache_files(self):
-        """Initialize cache files with empty data if they don't exist"""
+        """Initialize cache files with empty data if they don't exist
+        
+        Placeholders have no `last_updated`, so they always count as expired.
+        """
         for cache_type, filename in self.cache_files.items():
             filepath = os.path.join(self.cache_dir, filename)
             if not os.path.exists(filepath):
-                initial_data = {
-                    'data': [],
-                    'last_updated': datetime.now().isoformat(),
-                    'success': True
-                }
-                self._write_cache(cache_type, initial_data)
+                self._atomic_write(filepath, self.serializer.dumps(self._placeholder(cache_type)))
+    
+    @staticmethod
+    def _placeholder(cache_type):
+        """Empty, never populated entry of a cache type"""
+        return {
+            'data': {} if cache_type == 'positions' else [],
+            'last_updated': None,
+            'success': True,
+            'cache_type': cache_type
+        }
     
     def _get_cache_path(self, cache_type):
         """Get full path for cache file"""
         return os.path.join(self.cache_dir, self.cache_files[cache_type])
     
+    def _file_signature(self, filepath):
+        """Return (mtime, inode, size) of a cache file, or None if missing"""
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+    
+    def _remember(self, cache_type, cache_data, signature, channel_generation=None):
+        """Store a parsed cache entry in the memory tier and bump its generation"""
+        with self._memory_lock:
+            self._generation[cache_type] = self._generation.get(cache_type, 0) + 1
+            self._memory[cache_type] = {
+                'cache_data': cache_data,
+                'signature': signature,
+                'channel_generation': channel_generation,
+                'updated_at': self._parse_timestamp(cache_data.get('last_updated'))
+            }
+    
+    def _forget(self, cache_type):
+        """Drop a cache type from the memory tier"""
+        with self._memory_lock:
+            if self._memory.pop(cache_type, None) is not None:
+                self._generation[cache_type] = self._generation.get(cache_type, 0) + 1
+    
+    @staticmethod
+    def _parse_timestamp(value):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+    
+    def _atomic_write(self, filepath, payload):
+        """Write bytes to a temp file in the cache dir and move it into place
+        
+        os.replace is atomic, so concurrent readers see either the old or the
+        new file, never a half-written one.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
     def _write_cache(self, cache_type, data):
-        """Write data to cache file"""
+        """Write data to cache file and return the new cache entry"""
+        cache_data = {
+            'data': data,
+            'last_updated': datetime.now().isoformat(),
+            'success': True,
+            'cache_type': cache_type
+        }
+        
         try:
             filepath = self._get_cache_path(cache_type)
-            cache_data = {
-                'data': data,
-                'last_updated': datetime.now().isoformat(),
-                'success': True,
-                'cache_type': cache_type
-            }
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            with CACHE_SERIALIZE_SECONDS.time(cache_type=cache_type, operation='dumps'):
+                payload = self.serializer.dumps(cache_data)
+            with CACHE_DISK_SECONDS.time(cache_type=cache_type, operation='write'):
+                self._atomic_write(filepath, payload)
             
+            # Publish only after the file is in place, so other processes
+            # that see the new generation also see the new file
+            channel_generation = self.channel.publish(cache_type) if self.channel else None
+            self._remember(cache_type, cache_data, self._file_signature(filepath), channel_generation)
             self.last_update[cache_type] = datetime.now()
-            print(f"✅ Cache updated: {cache_type} at {datetime.now().strftime('%H:%M:%S')}")
+            logger.debug("✅ Cache updated: %s", cache_type)
             
         except Exception as e:
-            print(f"❌ Error writing cache {cache_type}: {e}")
+            logger.error("❌ Error writing cache %s: %s", cache_type, e)
+        
+        return cache_data
     
     def _read_cache(self, cache_type):
-        """Read data from cache file"""
+        """Read cache entry, serving it from memory unless the file changed on disk
+        
+        The returned dict is shared with the memory tier and must not be mutated.
+        """
         try:
+            entry = self._memory.get(cache_type)
+            channel_generation = None
+            if self.channel is not None:
+                # Unchanged generation: nothing was published, skip the stat
+                channel_generation = self.channel.generation(cache_type)
+                if entry is not None and entry['channel_generation'] == channel_generation:
+                    return entry['cache_data']
+            
             filepath = self._get_cache_path(cache_type)
+            signature = self._file_signature(filepath)
             
-            if not os.path.exists(filepath):
+            if signature is None:
+                self._forget(cache_type)
                 return None
-                
-            with open(filepath, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
             
+            if entry is not None and entry['signature'] == signature:
+                if channel_generation is not None:
+                    entry['channel_generation'] = channel_generation
+                return entry['cache_data']
+            
+            # Cold start or the file was rewritten by another process
+            with CACHE_DISK_SECONDS.time(cache_type=cache_type, operation='read'):
+                with open(filepath, 'rb') as f:
+                    payload = f.read()
+            with CACHE_SERIALIZE_SECONDS.time(cache_type=cache_type, operation='loads'):
+                cache_data = self.serializer.loads(payload)
+            
+            self._remember(cache_type, cache_data, signature, channel_generation)
             return cache_data
             
         except Exception as e:
-            print(f"❌ Error reading cache {cache_type}: {e}")
+            logger.error("❌ Error reading cache %s: %s", cache_type, e)
             return None
     
     def is_cache_expired(self, cache_type):
@@ -82,7 +201,7 @@ class CacheManager:
             return True
             
         time_diff = datetime.now() - self.last_update[cache_type]
-        return time_diff.total_seconds() > self.cache_expiry
+        return time_diff.total_seconds() > self.cache_expiry[cache_type]
     
     def get_cached_data(self, cache_type):
         """Get cached data, return None if expired or doesn't exist"""
@@ -93,35 +212,140 @@ class CacheManager:
             
         # Check if cache is expired
         try:
-            last_updated = datetime.fromisoformat(cache_data['last_updated'])
+            entry = self._memory.get(cache_type)
+            last_updated = entry['updated_at'] if entry else None
+            if last_updated is None:
+                if cache_data.get('last_updated') is None:
+                    return None  # placeholder, never populated
+                last_updated = datetime.fromisoformat(cache_data['last_updated'])
             time_diff = datetime.now() - last_updated
             
-            if time_diff.total_seconds() > self.cache_expiry:
-                print(f"⏰ Cache expired for {cache_type} (age: {time_diff.total_seconds():.1f}s)")
+            if time_diff.total_seconds() > self.cache_expiry[cache_type]:
+                logger.debug("⏰ Cache expired for %s (age: %.1fs)", cache_type, time_diff.total_seconds())
                 return None
                 
         except Exception as e:
-            print(f"❌ Error checking cache expiry for {cache_type}: {e}")
+            logger.error("❌ Error checking cache expiry for %s: %s", cache_type, e)
             return None
             
         return cache_data
     
+    def peek(self, cache_type):
+        """Fresh entry from the memory tier, or None, without any disk access
+        
+        For callers that must not block (the ASGI app). Without a channel it
+        cannot notice files rewritten by other processes; fall back to
+        get_or_compute on None.
+        """
+        entry = self._memory.get(cache_type)
+        if entry is None or entry['updated_at'] is None:
+            return None
+        if self.channel is not None and entry['channel_generation'] != self.channel.generation(cache_type):
+            return None
+        if (datetime.now() - entry['updated_at']).total_seconds() > self.cache_expiry[cache_type]:
+            return None
+        CACHE_REQUESTS.inc(cache_type=cache_type, result='hit')
+        return entry['cache_data']
+    
+    def latest(self, cache_type):
+        """Last stored entry, expired or not (the placeholder before the first one)
+        
+        For cache types produced elsewhere: by another process, or by a
+        background worker that owns the snapshot.
+        """
+        return self._read_cache(cache_type) or self._placeholder(cache_type)
+    
     def update_cache(self, cache_type, data):
         """Update cache with new data"""
         self._write_cache(cache_type, data)
     
-    def get_cache_info(self):
-        """Get information about all cache files"""
+    def get_or_compute(self, cache_type, producer):
+        """Get cached data, regenerating it with `producer()` when expired
+        
+        Only one caller per cache type runs the producer. While it runs, other
+        callers get the stale entry (stale-while-revalidate), or wait for the
+        fresh one if there is no stale entry.
+        
+        Returns a (cache_data, computed) tuple.
+        """
+        cache_data = self.get_cached_data(cache_type)
+        if cache_data:
+            CACHE_REQUESTS.inc(cache_type=cache_type, result='hit')
+            return cache_data, False
+        
+        if self.read_only:
+            # Another process owns refreshes; serve what it last published
+            CACHE_REQUESTS.inc(cache_type=cache_type, result='stale')
+            return self.latest(cache_type), False
+        
+        lock = self._compute_locks[cache_type]
+        if not lock.acquire(blocking=False):
+            stale = self._read_cache(cache_type)
+            if stale and stale.get('last_updated'):
+                CACHE_REQUESTS.inc(cache_type=cache_type, result='stale')
+                return stale, False
+            lock.acquire()
+        
+        try:
+            # Another caller may have refreshed it while we waited for the lock
+            cache_data = self.get_cached_data(cache_type)
+            if cache_data:
+                CACHE_REQUESTS.inc(cache_type=cache_type, result='hit')
+                return cache_data, False
+            CACHE_REQUESTS.inc(cache_type=cache_type, result='miss')
+            return self._write_cache(cache_type, producer()), True
+        finally:
+            lock.release()
+    
+    def get_view(self, cache_data, name, builder):
+        """Get a value derived from a cache entry, built once per generation
+        
+        `builder(cache_data)` runs only when `cache_data` is a different entry
+        than the one the view was last built from, so indexes and similar
+        structures are rebuilt once per refresh instead of once per request.
+        """
+        key = (cache_data.get('cache_type'), name)
+        view = self._views.get(key)
+        if view is not None and view[0] is cache_data:
+            return view[1]
+        
+        with self._memory_lock:
+            lock = self._view_locks.setdefault(key, threading.Lock())
+        
+        with lock:
+            view = self._views.get(key)
+            if view is not None and view[0] is cache_data:
+                return view[1]
+            value = builder(cache_data)
+            self._views[key] = (cache_data, value)
+            return value
+    
+    def refresh(self, cache_type, producer):
+        """Regenerate a cache type unconditionally, serialized with get_or_compute"""
+        with self._compute_locks[cache_type]:
+            return self._write_cache(cache_type, producer())
+    
+    def get_cache_info(self, check_disk=False):
+        """Get information about all cache files
+        
+        By default this only reports what the memory tier holds, without
+        touching the disk; `check_disk` first picks up files rewritten by
+        other processes.
+        """
         info = {}
         
         for cache_type in self.cache_files.keys():
-            cache_data = self._read_cache(cache_type)
+            if check_disk:
+                self._read_cache(cache_type)
+            entry = self._memory.get(cache_type)
+            cache_data = entry['cache_data'] if entry else None
             
-            if cache_data:
+            if cache_data and entry:
                 info[cache_type] = {
                     'last_updated': cache_data['last_updated'],
                     'exists': True,
-                    'file_size': os.path.getsize(self._get_cache_path(cache_type))
+                    'file_size': entry['signature'][2],
+                    'generation': self._generation.get(cache_type, 0)
                 }
             else:
                 info[cache_type] = {
@@ -138,31 +362,21 @@ class CacheManager:
             filepath = self._get_cache_path(cache_type)
             if os.path.exists(filepath):
                 os.remove(filepath)
-                print(f"🗑️ Cleared cache: {cache_type}")
+                logger.info("🗑️ Cleared cache: %s", cache_type)
+            self._forget(cache_type)
+            if self.channel is not None:
+                self.channel.publish(cache_type)
         else:
             # Clear all cache files
             for cache_type in self.cache_files.keys():
                 filepath = self._get_cache_path(cache_type)
                 if os.path.exists(filepath):
                     os.remove(filepath)
-            print("🗑️ Cleared all cache files")
-    
-    def start_auto_refresh(self, refresh_callback, interval=30):
-        """Start automatic cache refresh in background"""
-        def refresh_worker():
-            while True:
-                try:
-                    print(f"🔄 Auto-refreshing cache at {datetime.now().strftime('%H:%M:%S')}")
-                    refresh_callback()
-                    time.sleep(interval)
-                except Exception as e:
-                    print(f"❌ Error in auto-refresh: {e}")
-                    time.sleep(interval)
-        
-        refresh_thread = threading.Thread(target=refresh_worker, daemon=True)
-        refresh_thread.start()
-        print(f"🤖 Auto-refresh started (interval: {interval}s)")
-        
+                self._forget(cache_type)
+                if self.channel is not None:
+                    self.channel.publish(cache_type)
+            logger.info("🗑️ Cleared all cache files")
+    
     def get_last_update_time(self, cache_type):
         """Get last update time for specific cache type"""
         cache_data = self._read_cache(cache_type)
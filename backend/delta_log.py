@@ -0,0 +1,142 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+EMPTY_TOKEN = '0'  # version of a log that has not seen a snapshot yet
+
+
+def version_token(last_updated):
+    """Version token of the snapshot with this `last_updated` time
+
+    Every process that loads a snapshot derives the same token from it, and
+    later snapshots get tokens that sort after earlier ones.
+    """
+    if not last_updated:
+        return EMPTY_TOKEN
+    try:
+        return datetime.fromisoformat(last_updated).strftime('%Y%m%d%H%M%S%f')
+    except ValueError:
+        return last_updated
+
+
+class DeltaLog:
+    """Short ring buffer of diffs between consecutive snapshots
+
+    Snapshots are keyed collections (trains by id, positions by train id).
+    Clients receive an opaque version token with every response and can ask
+    for the changes since that token. Tokens come from the snapshot itself
+    (see version_token), so the workers of a multi-process deployment accept
+    each other's tokens; tokens older than the ring buffer, or of snapshots
+    this process never observed, simply fall back to a full response.
+    """
+
+    def __init__(self, size=20, ignore_fields=()):
+        self.ignore_fields = frozenset(ignore_fields)
+        self._diffs = deque(maxlen=size)  # (token before, added ids, changed ids, removed ids)
+        self._items = {}                  # key -> item of the current snapshot
+        self._order = []                  # current snapshot as a list
+        self._token = EMPTY_TOKEN
+        self._source = None
+        self._last_updated = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def _comparable(self, item):
+        if not self.ignore_fields:
+            return item
+        return {k: v for k, v in item.items() if k not in self.ignore_fields}
+
+    def observe(self, cache_data, items):
+        """Record a snapshot, given its cache entry and (key, item) pairs
+
+        Entries older than the current snapshot are ignored, so a request
+        still holding a previous entry cannot move the log backwards, and so
+        is the current snapshot loaded again (e.g. from the cache file).
+        Returns True if a new version was recorded by this call.
+        """
+        if cache_data is self._source:
+            return False
+        with self._lock:
+            if cache_data is self._source:
+                return False
+            last_updated = cache_data.get('last_updated') or ''
+            if self._last_updated is not None and last_updated <= self._last_updated:
+                return False
+
+            new_items = dict(items)
+            added, changed = [], []
+            for key, item in new_items.items():
+                old = self._items.get(key)
+                if old is None:
+                    added.append(key)
+                elif self._comparable(old) != self._comparable(item):
+                    changed.append(key)
+            removed = [key for key in self._items if key not in new_items]
+
+            if self._source is not None:
+                self._diffs.append((self._token, added, changed, removed))
+            self._items = new_items
+            self._order = list(new_items.values())
+            self._token = version_token(last_updated)
+            self._source = cache_data
+            self._last_updated = last_updated
+
+        for listener in self._listeners:
+            listener(self.token())
+        return True
+
+    def add_listener(self, callback):
+        """Call `callback(token)` after every new version, on the observing thread"""
+        self._listeners.append(callback)
+
+    def token(self):
+        return self._token
+
+    def snapshot(self):
+        """Current (token, items list, cache entry) as one consistent triple"""
+        with self._lock:
+            return self.token(), self._order, self._source
+
+    def changes_since(self, token):
+        """Changes since `token` as a dict, or None if a full response is needed
+
+        The dict has the current `version`, `added` and `changed` items (both
+        keyed by key), `removed` keys, the snapshot `count` and the `source`
+        cache entry.
+        """
+        with self._lock:
+            if self._source is None:
+                return None
+            if token == self._token:
+                start = len(self._diffs)
+            else:
+                start = next((i for i, diff in enumerate(self._diffs) if diff[0] == token), None)
+                if start is None:
+                    return None  # unknown, or fell out of the ring buffer
+
+            added, changed, removed = set(), set(), set()
+            for _, diff_added, diff_changed, diff_removed in list(self._diffs)[start:]:
+                for key in diff_added:
+                    if key in removed:
+                        removed.discard(key)  # re-added, the client still has it
+                        changed.add(key)
+                    else:
+                        added.add(key)
+                for key in diff_changed:
+                    if key not in added:
+                        changed.add(key)
+                for key in diff_removed:
+                    if key in added:
+                        added.discard(key)  # never seen by the client
+                    else:
+                        changed.discard(key)
+                        removed.add(key)
+
+            return {
+                'version': self.token(),
+                'added': {key: self._items[key] for key in added},
+                'changed': {key: self._items[key] for key in changed},
+                'removed': sorted(removed),
+                'count': len(self._items),
+                'source': self._source,
+            }
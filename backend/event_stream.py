@@ -0,0 +1,126 @@
+import json
+import queue
+import threading
+
+# Event types a stream subscriber can ask for (?events=positions,trains)
+STREAM_EVENTS = ('positions', 'trains')
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One connected stream client with its own filters and message queue"""
+
+    def __init__(self, train_ids=None, bbox=None, maxsize=50, events=('positions',)):
+        self.train_ids = set(train_ids) if train_ids else None
+        self.bbox = bbox
+        self.events = set(events)
+        self.queue = queue.Queue(maxsize=maxsize)
+        # With a bbox: trains last sent as inside it, to notice them leaving
+        self.visible = set() if bbox is not None else None
+        self._lock = threading.Lock()
+
+    def matches(self, position_data):
+        if self.train_ids is not None and position_data['train_id'] not in self.train_ids:
+            return False
+        if self.bbox is not None:
+            west, south, east, north = self.bbox
+            position = position_data['position']
+            if not (south <= position['lat'] <= north and west <= position['lng'] <= east):
+                return False
+        return True
+
+    def wants_removal(self, train_id):
+        return self.train_ids is None or train_id in self.train_ids
+
+    def select(self, updates, removed=()):
+        """(updates matching the filters, ids to remove) for this subscriber
+
+        Besides the removed trains that pass the id filter, trains that were
+        inside the bbox and have moved out of it are removed too.
+        """
+        matching = [update for update in updates if self.matches(update)]
+        gone = [train_id for train_id in removed if self.wants_removal(train_id)]
+        if self.visible is None:
+            return matching, gone
+        inside = {update['train_id'] for update in matching}
+        with self._lock:
+            left = [update['train_id'] for update in updates
+                    if update['train_id'] in self.visible and update['train_id'] not in inside]
+            self.visible.difference_update(left)
+            self.visible.difference_update(removed)
+            self.visible.update(inside)
+        return matching, gone + left
+
+    def send(self, message):
+        """Queue a message; a client that cannot keep up is told to resync"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait(format_event('resync', {}))
+
+    def get(self, timeout):
+        """Next message, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroadcaster:
+    """Fans out position and delay updates to all stream subscribers"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, train_ids=None, bbox=None, events=('positions',)):
+        return self.add(Subscriber(train_ids=train_ids, bbox=bbox, events=events))
+
+    def add(self, subscriber):
+        """Register an already constructed subscriber (e.g. an asyncio one)"""
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish_positions(self, version, updates, removed):
+        """Send each subscriber the updates and removals that match its filters"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            if 'positions' not in subscriber.events:
+                continue
+            matching, gone = subscriber.select(updates, removed)
+            if matching or gone:
+                subscriber.send(format_event(
+                    'positions',
+                    {'version': version, 'updates': matching, 'removed': gone},
+                    event_id=version
+                ))
+
+    def publish_trains(self, version):
+        """Tell the subscribers of trains events that a new trains snapshot is out"""
+        with self._lock:
+            subscribers = [subscriber for subscriber in self._subscribers
+                           if 'trains' in subscriber.events]
+
+        message = format_event('trains', {'version': version})
+        for subscriber in subscribers:
+            subscriber.send(message)
@@ -0,0 +1,260 @@
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+# One append-only file per column in every segment directory
+COLUMNS = {
+    'timestamp': np.float64,  # unix seconds
+    'vehicle': np.int32,      # code into the segment's vehicles.txt
+    'lat': np.float32,
+    'lng': np.float32,
+    'delay': np.int16,        # minutes
+    'station': np.int32,      # code into the segment's stations.txt (current station)
+}
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+
+class _Dictionary:
+    """Append-only string <-> int code mapping persisted one value per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self.values = []
+        self.codes = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        self.sync()
+
+    def sync(self):
+        """Pick up values appended by another process"""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+        except OSError:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # partially written line, read it next time
+                self._add(line[:-1].decode('utf-8'))
+                self._offset += len(line)
+
+    def _add(self, value):
+        self.codes[value] = len(self.values)
+        self.values.append(value)
+
+    def encode(self, values):
+        """Codes of `values`, appending the unknown ones in a single write"""
+        codes = self.codes
+        if all(value in codes for value in values):
+            return [codes[value] for value in values]
+        with self._lock:
+            self._sync()
+            lines = []
+            for value in values:
+                if value not in codes:
+                    self._add(value)
+                    lines.append(value.replace('\n', ' ') + '\n')
+            if lines:
+                data = ''.join(lines).encode('utf-8')
+                with open(self.path, 'ab') as f:
+                    f.write(data)
+                self._offset += len(data)
+            return [codes[value] for value in values]
+
+
+class HistoryStore:
+    """Columnar, time-partitioned position and delay history
+
+    Every `segment_seconds` window is a directory of raw NumPy column files
+    that only ever grow, with its own vehicle and station dictionaries.
+    Queries memory-map the segments overlapping the requested time range and
+    filter them with vectorized masks. With `retention_seconds`, segments
+    that ended longer ago than that are deleted when a new segment starts,
+    together with their maps and dictionaries, so disk and memory use stay
+    bounded.
+    """
+
+    def __init__(self, directory='history', segment_seconds=3600, retention_seconds=None):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._dictionaries = {}  # segment start -> (vehicles, stations)
+        self._maps = {}  # column path -> (file size, memmap)
+        self._current_segment = None
+        self._lock = threading.Lock()
+
+    def _segment_path(self, segment_start):
+        return os.path.join(self.directory, str(int(segment_start)))
+
+    def _segment_dictionaries(self, segment_start):
+        """(vehicles, stations) dictionaries of a segment"""
+        dictionaries = self._dictionaries.get(segment_start)
+        if dictionaries is None:
+            path = self._segment_path(segment_start)
+            dictionaries = self._dictionaries.setdefault(segment_start, (
+                _Dictionary(os.path.join(path, 'vehicles.txt')),
+                _Dictionary(os.path.join(path, 'stations.txt'))))
+        return dictionaries
+
+    def append(self, trains, timestamp=None):
+        """Append one row per train of a snapshot; returns the number of rows"""
+        if not trains:
+            return 0
+        timestamp = time.time() if timestamp is None else timestamp
+        segment_start = int(timestamp // self.segment_seconds * self.segment_seconds)
+
+        with self._lock:
+            if segment_start != self._current_segment:
+                self._current_segment = segment_start
+                self._prune(timestamp)
+            path = self._segment_path(segment_start)
+            os.makedirs(path, exist_ok=True)
+            vehicles, stations = self._segment_dictionaries(segment_start)
+            columns = {
+                'timestamp': np.full(len(trains), timestamp, dtype=COLUMNS['timestamp']),
+                'vehicle': np.array(vehicles.encode([t['id'] for t in trains]),
+                                    dtype=COLUMNS['vehicle']),
+                'lat': np.array([t['position']['lat'] for t in trains], dtype=COLUMNS['lat']),
+                'lng': np.array([t['position']['lng'] for t in trains], dtype=COLUMNS['lng']),
+                'delay': np.array([t['delay_minutes'] for t in trains], dtype=COLUMNS['delay']),
+                'station': np.array(stations.encode([t['current_station'] for t in trains]),
+                                    dtype=COLUMNS['station']),
+            }
+            for name, values in columns.items():
+                with open(os.path.join(path, f"{name}.bin"), 'ab') as f:
+                    values.tofile(f)
+        return len(trains)
+
+    def _prune(self, now):
+        """Delete the segments that ended before the retention period"""
+        if self.retention_seconds is None:
+            return
+        cutoff = now - self.retention_seconds
+        for segment_start in self._segments(float('-inf'), cutoff):
+            if segment_start + self.segment_seconds <= cutoff:
+                self._evict(segment_start)
+                shutil.rmtree(self._segment_path(segment_start), ignore_errors=True)
+
+    def _evict(self, segment_start):
+        """Drop the maps and dictionaries of a segment"""
+        self._dictionaries.pop(segment_start, None)
+        prefix = self._segment_path(segment_start) + os.sep
+        for path in [path for path in list(self._maps) if path.startswith(prefix)]:
+            self._maps.pop(path, None)
+
+    def _map(self, path, dtype):
+        """Memory-map a column file, re-mapping when it has grown"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=dtype)
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        if size == 0:
+            return np.empty(0, dtype=dtype)
+        mapped = np.memmap(path, dtype=dtype, mode='r')
+        self._maps[path] = (size, mapped)
+        return mapped
+
+    def _segments(self, start, end):
+        """Start times of the segments overlapping [start, end)
+
+        Also forgets segments deleted meanwhile, e.g. by another process.
+        """
+        present = {int(name) for name in os.listdir(self.directory) if name.isdigit()}
+        for segment_start in list(self._dictionaries):
+            if segment_start not in present:
+                self._evict(segment_start)
+        return sorted(segment_start for segment_start in present
+                      if segment_start < end and segment_start + self.segment_seconds > start)
+
+    def _read(self, segment_start, start, end, names):
+        """Columns of the rows of one segment with start <= timestamp < end"""
+        path = self._segment_path(segment_start)
+        columns = {name: self._map(os.path.join(path, f"{name}.bin"), COLUMNS[name])
+                   for name in set(names) | {'timestamp'}}
+        # A crash mid-append can leave some columns one batch longer
+        length = min(len(values) for values in columns.values())
+        timestamps = columns['timestamp'][:length]
+        mask = (timestamps >= start) & (timestamps < end)
+        return {name: columns[name][:length][mask] for name in names}
+
+    def train_history(self, train_id, start, end):
+        """Timestamps, positions and delays of one train, oldest first
+
+        None if the train has no segment overlapping the time range.
+        """
+        names = ('timestamp', 'lat', 'lng', 'delay')
+        parts = {name: [] for name in names}
+        found = False
+        for segment_start in self._segments(start, end):
+            vehicles, _ = self._segment_dictionaries(segment_start)
+            vehicles.sync()
+            code = vehicles.codes.get(train_id)
+            if code is None:
+                continue
+            found = True
+            columns = self._read(segment_start, start, end, names + ('vehicle',))
+            mask = columns['vehicle'] == code
+            for name in names:
+                parts[name].append(columns[name][mask])
+        if not found:
+            return None
+        columns = {name: np.concatenate(values) for name, values in parts.items()}
+        order = np.argsort(columns['timestamp'], kind='stable')
+        return {name: values[order] for name, values in columns.items()}
+
+    def delay_stats(self, start, end, station=None, percentiles=DEFAULT_PERCENTILES):
+        """Delay distribution over [start, end), overall and per current station"""
+        delay_parts = []
+        station_totals = {}  # station -> [samples, sum of delays]
+        for segment_start in self._segments(start, end):
+            columns = self._read(segment_start, start, end, ('delay', 'station'))
+            # After the read: every code in the columns was written to the dictionary first
+            _, stations = self._segment_dictionaries(segment_start)
+            stations.sync()
+            delays = columns['delay'].astype(np.float64)
+            station_codes = columns['station']
+            if station is not None:
+                code = stations.codes.get(station)
+                mask = station_codes == code if code is not None else np.zeros(len(delays), dtype=bool)
+                delays = delays[mask]
+                station_codes = station_codes[mask]
+            delay_parts.append(delays)
+
+            counts = np.bincount(station_codes, minlength=len(stations.values))
+            totals = np.bincount(station_codes, weights=delays, minlength=len(stations.values))
+            present = np.nonzero(counts)[0]
+            for code, count, total in zip(present.tolist(), counts[present].tolist(),
+                                          totals[present].tolist()):
+                entry = station_totals.setdefault(stations.values[code], [0, 0.0])
+                entry[0] += count
+                entry[1] += total
+
+        delays = np.concatenate(delay_parts) if delay_parts else np.empty(0, dtype=np.float64)
+        return {
+            'samples': int(len(delays)),
+            'average': round(float(delays.mean()), 2) if len(delays) else None,
+            'max': int(delays.max()) if len(delays) else None,
+            'percentiles': dict(zip(
+                (f"p{p}" for p in percentiles),
+                (np.percentile(delays, percentiles).round(2).tolist() if len(delays)
+                 else [None] * len(percentiles))
+            )),
+            'stations': {
+                name: {'samples': count, 'average': round(total / count, 2)}
+                for name, (count, total) in station_totals.items()
+            },
+        }
@@ -0,0 +1,198 @@
+import logging
+import random
+import threading
+from datetime import datetime
+from sys import intern
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import REFRESH_FAILURES, REFRESH_SECONDS
+from train_records import LiveTrainRecord, Position, Stop
+
+logger = logging.getLogger(__name__)
+
+EMMA_GRAPHQL_URL = "https://emma.mav.hu/otp2-backend/otp/routers/default/index/graphql"
+
+# Positions and stop times in a single query, instead of one trip query per vehicle
+VEHICLE_POSITIONS_QUERY = """{
+  vehiclePositions(swLat: 45.5, swLon: 16.1, neLat: 48.7, neLon: 22.8, modes: [RAIL, RAIL_REPLACEMENT_BUS]) {
+    vehicleId lat lon label speed heading
+    trip {
+      gtfsId tripShortName tripHeadsign
+      stoptimes { stop { name lat lon } scheduledArrival realtimeArrival realtimeDeparture arrivalDelay }
+    }
+  }
+}"""
+
+DELAYED_THRESHOLD = 5  # minutes; above this a train counts as delayed
+
+
+class IngestionError(Exception):
+    """The upstream feed returned an unusable response"""
+
+
+def _hhmm(seconds):
+    seconds = int(seconds or 0) % (24 * 3600)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+def normalize_vehicle(vehicle, now_seconds):
+    """Convert one EMMA vehiclePositions entry into a train record
+
+    `now_seconds` is the time of day in seconds, in the same (service day)
+    clock as the stop times. Returns None for vehicles without a position.
+    """
+    if vehicle.get('lat') is None or vehicle.get('lon') is None:
+        return None
+
+    trip = vehicle.get('trip') or {}
+    stoptimes = trip.get('stoptimes') or []
+    short_name = trip.get('tripShortName') or vehicle.get('label') or vehicle['vehicleId']
+    headsign = trip.get('tripHeadsign') or ''
+
+    # The next stop is the first one the train has not departed from yet
+    current_index = next(
+        (i for i, st in enumerate(stoptimes) if (st.get('realtimeDeparture') or 0) > now_seconds),
+        len(stoptimes) - 1
+    )
+
+    route = []
+    for i, st in enumerate(stoptimes):
+        if i < current_index:
+            stop_status = "departed"
+        elif i == current_index:
+            stop_status = "current"
+        else:
+            stop_status = "upcoming"
+        route.append(Stop(intern(st['stop']['name']), intern(_hhmm(st.get('scheduledArrival'))),
+                          stop_status))
+
+    current = stoptimes[current_index] if stoptimes else {}
+    delay_minutes = max(0, round((current.get('arrivalDelay') or 0) / 60))
+
+    return LiveTrainRecord(
+        id=vehicle['vehicleId'],
+        name=f"{short_name} {headsign}".strip(),
+        type=intern(short_name.split()[0] if short_name.split() else "Vonat"),
+        from_station=route[0].station if route else "",
+        to_station=route[-1].station if route else intern(headsign),
+        departure_time=route[0].time if route else "",
+        arrival_time=route[-1].time if route else "",
+        current_station=intern(current.get('stop', {}).get('name', "")),
+        delay_minutes=delay_minutes,
+        status="delayed" if delay_minutes > DELAYED_THRESHOLD else "running",
+        position=Position(vehicle['lat'], vehicle['lon']),
+        route=tuple(route),
+        speed=round((vehicle.get('speed') or 0) * 3.6),
+        heading=vehicle.get('heading') or 0
+    )
+
+
+class EmmaSource:
+    """Polls the EMMA GraphQL feed over a pooled HTTP session
+
+    `url` can point at a local stub server in tests.
+    """
+
+    def __init__(self, url=EMMA_GRAPHQL_URL, timeout=10, pool_size=4, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0',
+            'Content-Type': 'application/json'
+        })
+
+    def fetch(self):
+        """Fetch and normalize all current vehicles"""
+        response = self.session.post(self.url, json={'query': VEHICLE_POSITIONS_QUERY},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+
+        if payload.get('errors'):
+            raise IngestionError(f"GraphQL errors: {payload['errors']}")
+        vehicles = (payload.get('data') or {}).get('vehiclePositions')
+        if vehicles is None:
+            raise IngestionError("Response has no vehiclePositions")
+
+        now = datetime.now()
+        now_seconds = now.hour * 3600 + now.minute * 60 + now.second
+        trains = (normalize_vehicle(vehicle, now_seconds) for vehicle in vehicles)
+        return [train for train in trains if train is not None]
+
+
+class StaticSource:
+    """Serves a fixed list of trains (tests, benchmarks)"""
+
+    def __init__(self, trains):
+        self.trains = trains
+
+    def fetch(self):
+        return list(self.trains)
+
+
+class IngestionWorker:
+    """Background poller that feeds a train source into the cache
+
+    Client requests never call upstream: they only see what the worker last
+    stored. Failed polls are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, source, cache_manager, on_update=None, interval=30,
+                 retry_delay=5, max_backoff=300):
+        self.source = source
+        self.cache_manager = cache_manager
+        self.on_update = on_update
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.last_trains = []
+        self.last_success = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        """Fetch once, store the snapshot and return the new cache entry"""
+        trains = self.source.fetch()
+        self.last_trains = trains
+        cache_data = self.cache_manager.refresh('trains', lambda: trains)
+        self.last_success = datetime.now()
+        if self.on_update:
+            self.on_update(cache_data)
+        return cache_data
+
+    def next_delay(self):
+        """Seconds until the next poll, backing off after failures"""
+        if not self.failures:
+            return self.interval
+        backoff = min(self.max_backoff, self.retry_delay * 2 ** (self.failures - 1))
+        return backoff * random.uniform(0.5, 1.0)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                with REFRESH_SECONDS.time(job='ingestion'):
+                    trains = self.poll_once()['data']
+                self.failures = 0
+                logger.debug("🛰️ Ingested %d vehicles", len(trains))
+            except Exception as e:
+                self.failures += 1
+                REFRESH_FAILURES.inc(job='ingestion')
+                logger.warning("❌ Ingestion failed (%dx): %s", self.failures, e)
+            self._stop.wait(self.next_delay())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name='ingestion')
+        self._thread.start()
+        logger.info("🛰️ Ingestion started (interval: %ss)", self.interval)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
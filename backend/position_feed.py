@@ -0,0 +1,62 @@
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from response_cache import CachedBody
+
+CONTENT_TYPE = 'application/octet-stream'
+MAGIC = b'TPF1'
+HEADER = struct.Struct('<4sI8s')  # magic, record count, id dictionary key
+# Packed little-endian records; `idx` is the train's position in the id dictionary
+RECORD = np.dtype([('idx', '<i4'), ('lat', '<f4'), ('lng', '<f4'), ('delay', '<i2'), ('status', 'u1')])
+STATUSES = ('running', 'delayed')  # status byte -> status; anything else is UNKNOWN_STATUS
+UNKNOWN_STATUS = 255
+
+
+class PositionFeed:
+    """Fixed-width binary encoding of one positions snapshot
+
+    The body is a header followed by one RECORD per train, in id dictionary
+    order, and is built once per refresh of the positions cache. Train ids
+    are sent separately as a JSON id dictionary (train ids sorted); its key,
+    repeated in every body header, is a hash of the ids, so the dictionary
+    keeps its ETag as long as the set of trains does not change.
+    """
+
+    def __init__(self, positions):
+        self.ids = sorted(positions)
+        self.key = hashlib.blake2b('\n'.join(self.ids).encode('utf-8'), digest_size=8).digest()
+        count = len(self.ids)
+        records = [positions[train_id] for train_id in self.ids]
+        status_codes = {status: code for code, status in enumerate(STATUSES)}
+
+        self.records = np.empty(count, dtype=RECORD)
+        self.records['idx'] = np.arange(count)
+        self.records['lat'] = np.fromiter((r['position']['lat'] for r in records), np.float32, count)
+        self.records['lng'] = np.fromiter((r['position']['lng'] for r in records), np.float32, count)
+        delays = np.fromiter((r['delay_minutes'] for r in records), np.int64, count)
+        self.records['delay'] = np.clip(delays, np.iinfo(np.int16).min, np.iinfo(np.int16).max)
+        self.records['status'] = np.fromiter(
+            (status_codes.get(r['status'], UNKNOWN_STATUS) for r in records), np.uint8, count)
+        self.body = self._encode(self.records)
+
+        self.dictionary = CachedBody(
+            json.dumps({"success": True, "key": self.key.hex(), "ids": self.ids},
+                       ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            f"ids-{self.key.hex()}"
+        )
+
+    @classmethod
+    def from_cache(cls, cache_data):
+        return cls(cache_data['data'])
+
+    def _encode(self, records):
+        return HEADER.pack(MAGIC, len(records), self.key) + records.tobytes()
+
+    def encode_bbox(self, west, south, east, north):
+        """Body with only the records inside a bounding box"""
+        lat, lng = self.records['lat'], self.records['lng']
+        inside = (lat >= south) & (lat <= north) & (lng >= west) & (lng <= east)
+        return self._encode(self.records[inside])
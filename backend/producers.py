@@ -0,0 +1,114 @@
+import random
+from datetime import datetime
+
+from train_records import Position, TrainRecord
+
+# Mock train data - in a real application, this would come from a database or external API
+MOCK_TRAINS = [
+    {
+        "id": "IC001",
+        "name": "InterCity Budapest-Debrecen",
+        "type": "InterCity",
+        "from_station": "Budapest-Keleti",
+        "to_station": "Debrecen",
+        "departure_time": "08:15",
+        "arrival_time": "10:45",
+        "current_station": "Szolnok",
+        "delay_minutes": 5,
+        "status": "running",
+        "position": {"lat": 47.1833, "lng": 20.2},
+        "route": [
+            {"station": "Budapest-Keleti", "time": "08:15", "status": "departed"},
+            {"station": "Cegléd", "time": "08:45", "status": "departed"},
+            {"station": "Szolnok", "time": "09:25", "status": "current"},
+            {"station": "Püspökladány", "time": "10:15", "status": "upcoming"},
+            {"station": "Debrecen", "time": "10:45", "status": "upcoming"}
+        ]
+    },
+    {
+        "id": "S001",
+        "name": "S-Bahn Budapest-Pécs",
+        "type": "Sebesvonat",
+        "from_station": "Budapest-Déli",
+        "to_station": "Pécs",
+        "departure_time": "09:30",
+        "arrival_time": "12:15",
+        "current_station": "Székesfehérvár",
+        "delay_minutes": 0,
+        "status": "running",
+        "position": {"lat": 47.1885, "lng": 18.4114},
+        "route": [
+            {"station": "Budapest-Déli", "time": "09:30", "status": "departed"},
+            {"station": "Székesfehérvár", "time": "10:30", "status": "current"},
+            {"station": "Siófok", "time": "11:15", "status": "upcoming"},
+            {"station": "Kaposvár", "time": "11:45", "status": "upcoming"},
+            {"station": "Pécs", "time": "12:15", "status": "upcoming"}
+        ]
+    },
+    {
+        "id": "R001",
+        "name": "Regionális Szeged-Budapest",
+        "type": "Regionális",
+        "from_station": "Szeged",
+        "to_station": "Budapest-Nyugati",
+        "departure_time": "07:00",
+        "arrival_time": "09:45",
+        "current_station": "Kecskemét",
+        "delay_minutes": 12,
+        "status": "delayed",
+        "position": {"lat": 46.9073, "lng": 19.6908},
+        "route": [
+            {"station": "Szeged", "time": "07:00", "status": "departed"},
+            {"station": "Kiskunfélegyháza", "time": "07:35", "status": "departed"},
+            {"station": "Kecskemét", "time": "08:15", "status": "current"},
+            {"station": "Cegléd", "time": "08:55", "status": "upcoming"},
+            {"station": "Budapest-Nyugati", "time": "09:45", "status": "upcoming"}
+        ]
+    }
+]
+
+
+def simulate_trains(trains):
+    """Records of `trains` with simulated position and delay changes
+
+    Trains may be records or dicts; records share their route with the
+    originals.
+    """
+    updated_trains = []
+    for train in trains:
+        train = TrainRecord.from_dict(train)
+        # Simulate slight position changes
+        position = Position(train.position.lat + random.uniform(-0.005, 0.005),
+                            train.position.lng + random.uniform(-0.005, 0.005))
+        # Simulate delay changes
+        delay_minutes = train.delay_minutes
+        if random.random() < 0.1:  # 10% chance of delay change
+            delay_minutes = max(0, delay_minutes + random.randint(-2, 3))
+        updated_trains.append(train.moved(position, delay_minutes))
+    return updated_trains
+
+
+def positions_from_trains(trains, jitter=0.0):
+    """Real-time position records keyed by train id
+
+    `jitter` (degrees) simulates movement between two trains snapshots.
+    """
+    timestamp = datetime.now().isoformat()
+    positions = {}
+    for train in trains:
+        position = dict(train['position'])
+        if jitter:
+            position['lat'] += random.uniform(-jitter, jitter)
+            position['lng'] += random.uniform(-jitter, jitter)
+        
+        positions[train['id']] = {
+            "success": True,
+            "train_id": train['id'],
+            "position": position,
+            "current_station": train['current_station'],
+            "status": train['status'],
+            "delay_minutes": train['delay_minutes'],
+            "timestamp": timestamp
+        }
+    return positions
+
@@ -0,0 +1,168 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import REFRESH_FAILURES, REFRESH_SECONDS, REFRESH_SKIPPED
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshJob:
+    """One periodic refresh with its schedule and run statistics"""
+
+    def __init__(self, name, func, interval, jitter):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0  # due while the previous run was still going
+        self.total_duration = 0.0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.last_started = None
+        self.last_success = None
+        self.last_error = None
+
+    def next_delay(self):
+        """Interval with +/- jitter, so jobs do not fire in lockstep"""
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def metrics(self):
+        return {
+            "interval": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_duration": self.last_duration,
+            "avg_duration": self.total_duration / self.runs if self.runs else None,
+            "max_duration": self.max_duration,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "last_started": self.last_started,
+            "last_success": self.last_success,
+            "last_error": self.last_error
+        }
+
+
+class RefreshScheduler:
+    """Runs refresh jobs at their own intervals on a thread pool
+
+    A single timer thread keeps the due times in a heap and hands due jobs
+    to the pool. A job never overlaps with itself: if it is still running
+    when it comes due again, that run is skipped and counted. Lag is the time
+    between when a run was due and when it actually started.
+    """
+
+    def __init__(self, max_workers=4, jitter=0.1):
+        self.max_workers = max_workers
+        self.jitter = jitter
+        self.jobs = {}
+        self._heap = []  # (due time, sequence, job name)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+
+    def add(self, name, func, interval, jitter=None, delay=0):
+        """Register `func` to run every `interval` seconds, first after `delay`"""
+        job = RefreshJob(name, func, interval, self.jitter if jitter is None else jitter)
+        with self._condition:
+            self.jobs[name] = job
+            self._push(time.monotonic() + delay, name)
+            self._condition.notify()
+        return job
+
+    def _push(self, due, name):
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, name))
+
+    def _run(self, job, due):
+        started = time.monotonic()
+        job.last_lag = max(0.0, started - due)
+        job.max_lag = max(job.max_lag, job.last_lag)
+        job.last_started = time.time()
+        try:
+            job.func()
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            REFRESH_FAILURES.inc(job=job.name)
+            logger.error("❌ Refresh job %s failed: %s", job.name, e)
+        else:
+            job.last_success = time.time()
+            job.last_error = None
+        finally:
+            duration = time.monotonic() - started
+            job.runs += 1
+            job.total_duration += duration
+            job.last_duration = duration
+            job.max_duration = max(job.max_duration, duration)
+            REFRESH_SECONDS.observe(duration, job=job.name)
+            with self._condition:
+                job.running = False
+
+    def _dispatch(self, name, due):
+        """Submit a due job unless it is still running; returns True if submitted"""
+        job = self.jobs[name]
+        with self._condition:
+            if job.running:
+                job.skipped += 1
+                REFRESH_SKIPPED.inc(job=name)
+                return False
+            job.running = True
+        self._executor.submit(self._run, job, due)
+        return True
+
+    def _loop(self):
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, name = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                job = self.jobs[name]
+                # Keep a fixed rate, but do not try to catch up on missed runs
+                next_due = due + job.next_delay()
+                self._push(next_due if next_due > now else now + job.next_delay(), name)
+
+                self._condition.release()
+                try:
+                    self._dispatch(name, due)
+                finally:
+                    self._condition.acquire()
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='refresh')
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='refresh-scheduler')
+        self._thread.start()
+        intervals = ', '.join(f"{name}: {job.interval}s" for name, job in self.jobs.items())
+        logger.info("🤖 Refresh scheduler started (%s)", intervals)
+
+    def stop(self, wait=True):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def metrics(self):
+        """Per-job run counts, durations and lag (seconds)"""
+        return {name: job.metrics() for name, job in self.jobs.items()}
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from serializers import get_serializer
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024  # bytes; smaller bodies are not worth compressing
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # higher qualities are too slow to redo on every refresh
+
+ENCODERS = {'gzip': lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL)}
+if brotli is not None:
+    ENCODERS['br'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+
+# Preferred first when the client accepts several with the same quality
+SUPPORTED_ENCODINGS = [name for name in ('br', 'gzip') if name in ENCODERS]
+
+
+class CachedBody:
+    """A response body rendered once, with its strong ETag and compressed variants"""
+
+    __slots__ = ('body', 'etag', 'variants')
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self.variants = {}  # encoding -> compressed body
+
+    def encoded(self, encoding):
+        """Return (body, etag) for a content coding, compressing on first use
+
+        Returns the identity body for None, unknown encodings and bodies too
+        small to benefit.
+        """
+        if encoding not in ENCODERS or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, self.etag
+        variant = self.variants.get(encoding)
+        if variant is None:
+            variant = self.variants.setdefault(encoding, ENCODERS[encoding](self.body))
+        return variant, f"{self.etag}-{encoding}"
+
+
+class ResponseCache:
+    """Pre-serialized JSON response bodies, kept per cache generation
+
+    Bodies are stored against the cache entry they were rendered from; when
+    the cache type gets a new entry, all of its bodies are dropped at once.
+    The ETag is derived from the cache type, the entry's `last_updated` and
+    the response key, so it is the same in every worker process. That makes
+    it a strong validator only if the body depends on nothing else: bodies
+    carry the version token of the entry they are rendered from, never the
+    process's current one.
+
+    Stored bodies are bounded by `max_bytes` (identity bodies; compressed
+    variants come on top) across all cache types. Past the budget the least
+    recently used bodies are evicted, so one-off filter, search and board
+    keys give way while hot keys like "all" stay.
+    """
+
+    def __init__(self, serializer='auto', max_bytes=64 * 2**20):
+        self.serializer = get_serializer(serializer)
+        self.max_bytes = max_bytes
+        self.size = 0  # bytes of stored bodies
+        self._bodies = {}  # cache_type -> (cache entry, {key: CachedBody})
+        self._lru = OrderedDict()  # (cache_type, key) -> body size, least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_etag(cache_type, last_updated, key):
+        return hashlib.blake2b(f"{cache_type}|{last_updated}|{key}".encode('utf-8'),
+                               digest_size=12).hexdigest()
+
+    def render(self, cache_data, key, build_payload, raw=False):
+        """Render a payload without storing it; with `raw` it already is the body bytes"""
+        cache_type = cache_data.get('cache_type')
+        payload = build_payload()
+        return CachedBody(
+            payload if raw else self.serializer.dumps(payload),
+            self.make_etag(cache_type, cache_data.get('last_updated'), key)
+        )
+
+    def peek(self, cache_data, key):
+        """The stored body for `key` of this cache entry, or None; never renders"""
+        cache_type = cache_data.get('cache_type')
+        generation = self._bodies.get(cache_type)
+        if generation is None or generation[0] is not cache_data:
+            return None
+        cached = generation[1].get(key)
+        if cached is not None:
+            with self._lock:
+                if (cache_type, key) in self._lru:
+                    self._lru.move_to_end((cache_type, key))
+        return cached
+
+    def get(self, cache_data, key, build_payload, raw=False):
+        """Get the body for `key`, rendering `build_payload()` on first use"""
+        cached = self.peek(cache_data, key)
+        if cached is not None:
+            return cached
+
+        cache_type = cache_data.get('cache_type')
+        cached = self.render(cache_data, key, build_payload, raw)
+        size = len(cached.body)
+        if size > self.max_bytes:
+            return cached
+
+        with self._lock:
+            generation = self._bodies.get(cache_type)
+            if generation is None or generation[0] is not cache_data:
+                if generation is not None:
+                    for old_key in generation[1]:
+                        self.size -= self._lru.pop((cache_type, old_key))
+                generation = (cache_data, {})
+                self._bodies[cache_type] = generation
+            stored = generation[1].setdefault(key, cached)
+            if stored is not cached:
+                return stored
+            self._lru[(cache_type, key)] = size
+            self.size += size
+            while self.size > self.max_bytes:
+                (evicted_type, evicted_key), evicted_size = self._lru.popitem(last=False)
+                del self._bodies[evicted_type][1][evicted_key]
+                self.size -= evicted_size
+        return cached
@@ -0,0 +1,105 @@
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+
+# Field -> ranking weight; ids and names matter more than stations
+SEARCH_FIELDS = {
+    'id': 5.0,
+    'name': 3.0,
+    'current_station': 2.0,
+    'from_station': 1.0,
+    'to_station': 1.0,
+}
+
+MAX_GRAM = 3
+_WORD_SPLIT = re.compile(r'[\s\-/]+')
+
+
+def fold(text):
+    """Lowercase and strip accents, so 'Püspökladány' matches 'puspokladany'"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SearchIndex:
+    """N-gram substring index over the searchable train fields
+
+    The index is built over the distinct folded field values (terms), which
+    are far fewer than trains * fields because stations repeat. A query is
+    split into n-grams, the posting sets are intersected to get candidate
+    terms, and only those are verified with a real substring check.
+    """
+
+    def __init__(self, trains):
+        self.trains = trains
+        self.terms = []             # term id -> folded text
+        self.term_words = []        # term id -> words of the folded text
+        self.postings = []          # term id -> [(train position, field weight)]
+        self.grams = defaultdict(set)  # n-gram (n <= MAX_GRAM) -> term ids
+
+        term_ids = {}
+        for pos, train in enumerate(trains):
+            for field, weight in SEARCH_FIELDS.items():
+                term = fold(train[field])
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(self.terms)
+                    self.terms.append(term)
+                    self.term_words.append(_WORD_SPLIT.split(term))
+                    self.postings.append([])
+                    for n in range(1, MAX_GRAM + 1):
+                        for gram in _grams(term, n):
+                            self.grams[gram].add(term_id)
+                self.postings[term_id].append((pos, weight))
+
+    @classmethod
+    def from_cache(cls, cache_data):
+        return cls(cache_data['data'])
+
+    def _candidate_terms(self, query):
+        n = min(len(query), MAX_GRAM)
+        posting_sets = sorted((self.grams.get(gram, set()) for gram in _grams(query, n)), key=len)
+        if not posting_sets or not posting_sets[0]:
+            return set()
+        candidates = posting_sets[0].intersection(*posting_sets[1:])
+        if len(query) <= MAX_GRAM:
+            return candidates
+        return {term_id for term_id in candidates if query in self.terms[term_id]}
+
+    def _match_quality(self, term_id, query):
+        term = self.terms[term_id]
+        if term == query:
+            return 4.0
+        if term.startswith(query):
+            return 3.0
+        if any(word.startswith(query) for word in self.term_words[term_id]):
+            return 2.0
+        return 1.0
+
+    def search(self, query, limit=None):
+        """Ranked trains matching `query` as a substring of any search field
+
+        Returns (results, total) where `total` is the number of matches before
+        `limit` was applied.
+        """
+        query = fold(query.strip())
+        if not query:
+            return [], 0
+
+        scores = defaultdict(float)
+        for term_id in self._candidate_terms(query):
+            quality = self._match_quality(term_id, query)
+            for pos, weight in self.postings[term_id]:
+                scores[pos] += quality * weight
+
+        rank_key = lambda pos: (-scores[pos], pos)
+        if limit is not None and limit < len(scores):
+            ranked = heapq.nsmallest(limit, scores, key=rank_key)
+        else:
+            ranked = sorted(scores, key=rank_key)
+        return [self.trains[pos] for pos in ranked], len(scores)
@@ -0,0 +1,113 @@
+import json
+import pickle
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+def _plain(obj):
+    """Dict for mapping-like objects such as the train records"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class JsonSerializer:
+    """Compact JSON using the standard library"""
+    name = 'json'
+    extension = '.json'
+
+    def dumps(self, obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_plain).encode('utf-8')
+
+    def loads(self, raw):
+        return json.loads(raw)
+
+
+class PrettyJsonSerializer(JsonSerializer):
+    """Indented JSON, the original on-disk format (kept for debugging and benchmarks)"""
+    name = 'json-pretty'
+
+    def dumps(self, obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=_plain).encode('utf-8')
+
+
+class OrjsonSerializer:
+    """Compact JSON using orjson"""
+    name = 'orjson'
+    extension = '.json'
+
+    def dumps(self, obj):
+        # Dataclasses (the train records) are serialized natively
+        return orjson.dumps(obj, default=_plain)
+
+    def loads(self, raw):
+        return orjson.loads(raw)
+
+
+class MsgpackSerializer:
+    """Binary MessagePack encoding"""
+    name = 'msgpack'
+    extension = '.msgpack'
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True, default=_plain)
+
+    def loads(self, raw):
+        return msgpack.unpackb(raw, raw=False)
+
+
+class PickleSerializer:
+    """Python pickle; only use it when the cache directory is trusted"""
+    name = 'pickle'
+    extension = '.pickle'
+
+    def dumps(self, obj):
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, raw):
+        return pickle.loads(raw)
+
+
+SERIALIZERS = {
+    'json': JsonSerializer,
+    'json-pretty': PrettyJsonSerializer,
+    'orjson': OrjsonSerializer,
+    'msgpack': MsgpackSerializer,
+    'pickle': PickleSerializer,
+}
+
+_REQUIREMENTS = {
+    'orjson': lambda: orjson is not None,
+    'msgpack': lambda: msgpack is not None,
+}
+
+
+def available_serializers():
+    """Names of the serializers usable in this environment"""
+    return [name for name in SERIALIZERS
+            if _REQUIREMENTS.get(name, lambda: True)()]
+
+
+def get_serializer(name='auto'):
+    """Create a serializer by name
+
+    'auto' picks orjson when it is installed and falls back to compact JSON.
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown cache serializer: {name}")
+    if name not in available_serializers():
+        raise ValueError(f"Cache serializer '{name}' is not installed")
+
+    return SERIALIZERS[name]()
@@ -0,0 +1,160 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for the redis channel
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_COUNTER = struct.Struct('<Q')
+
+
+class MmapChannel:
+    """Per-cache-type generation counters in a shared memory-mapped file
+
+    Writers bump the counter of a cache type after replacing its file;
+    readers compare counters with plain memory reads, without a syscall.
+    """
+
+    def __init__(self, path, cache_types):
+        self.path = path
+        self.slots = {cache_type: i for i, cache_type in enumerate(sorted(cache_types))}
+        size = _COUNTER.size * len(self.slots)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._lock = threading.Lock()
+
+    def generation(self, cache_type):
+        return _COUNTER.unpack_from(self._map, self.slots[cache_type] * _COUNTER.size)[0]
+
+    def publish(self, cache_type):
+        """Bump and return the generation of a cache type"""
+        offset = self.slots[cache_type] * _COUNTER.size
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = _COUNTER.unpack_from(self._map, offset)[0] + 1
+                _COUNTER.pack_into(self._map, offset, value)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return value
+
+
+class RedisChannel:
+    """Generation counters kept in Redis, for workers on several hosts"""
+
+    def __init__(self, client, prefix='lazarexpress:generation:'):
+        self.client = client
+        self.prefix = prefix
+
+    def generation(self, cache_type):
+        return int(self.client.get(self.prefix + cache_type) or 0)
+
+    def publish(self, cache_type):
+        return int(self.client.incr(self.prefix + cache_type))
+
+
+def create_channel(url, cache_dir, cache_types):
+    """Channel for a `redis://` URL, otherwise an mmap file in the cache directory"""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is None:
+            raise RuntimeError("the redis package is required for a redis snapshot channel")
+        return RedisChannel(redis.Redis.from_url(url))
+    return MmapChannel(url or os.path.join(cache_dir, 'generations.mmap'), cache_types)
+
+
+class LeaderElection:
+    """Elects a single process per lock file using an exclusive flock
+
+    The lock is held for the lifetime of the process and released by the
+    kernel when it exits, at which point a waiting process takes over.
+    """
+
+    def __init__(self, lock_path, on_elected, retry_interval=5):
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._fd = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def try_acquire(self):
+        """Try to become the leader without blocking"""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            # No flock: assume a single-process deployment
+            self.is_leader = True
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        return True
+
+    def run(self):
+        while not self._stop.is_set():
+            if self.try_acquire():
+                logger.info("👑 Worker %d elected to refresh data", os.getpid())
+                self.on_elected()
+                return
+            self._stop.wait(self.retry_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name='leader-election')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class SnapshotWatcher:
+    """Calls `on_change(cache_type)` when another process publishes a new generation"""
+
+    def __init__(self, channel, cache_types, on_change, interval=0.5):
+        self.channel = channel
+        self.cache_types = cache_types
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self):
+        seen = {cache_type: self.channel.generation(cache_type) for cache_type in self.cache_types}
+        while not self._stop.wait(self.interval):
+            for cache_type in self.cache_types:
+                try:
+                    generation = self.channel.generation(cache_type)
+                    if generation != seen[cache_type]:
+                        seen[cache_type] = generation
+                        self.on_change(cache_type)
+                except Exception as e:
+                    logger.error("❌ Error handling new %s snapshot: %s", cache_type, e)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True, name='snapshot-watcher')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,143 @@
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """Uniform lat/lng grid over the current train positions
+
+    Each train sits in exactly one cell. Refreshes only move the trains whose
+    cell changed, so keeping the index current costs a dict lookup per train
+    instead of a rebuild.
+    """
+
+    def __init__(self, cell_size=0.1):
+        self.cell_size = cell_size  # degrees
+        self.cells = {}      # (row, col) -> set of train ids
+        self.positions = {}  # train id -> (lat, lng, cell)
+        self._source = None
+        self._last_updated = None
+        self._lock = threading.RLock()
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def update(self, trains):
+        """Bring the index to a new snapshot; returns the number of cell moves"""
+        moved = 0
+        with self._lock:
+            seen = set()
+            for train in trains:
+                train_id = train['id']
+                lat, lng = train['position']['lat'], train['position']['lng']
+                cell = self._cell(lat, lng)
+                seen.add(train_id)
+                old = self.positions.get(train_id)
+                if old is None or old[2] != cell:
+                    if old is not None:
+                        self._discard(train_id, old[2])
+                    self.cells.setdefault(cell, set()).add(train_id)
+                    moved += 1
+                self.positions[train_id] = (lat, lng, cell)
+
+            for train_id in [i for i in self.positions if i not in seen]:
+                self._discard(train_id, self.positions.pop(train_id)[2])
+                moved += 1
+        return moved
+
+    def _discard(self, train_id, cell):
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(train_id)
+            if not members:
+                del self.cells[cell]
+
+    def observe(self, cache_data):
+        """Update from a trains cache entry unless it is older than the indexed one"""
+        if cache_data is self._source:
+            return False
+        with self._lock:
+            if cache_data is self._source:
+                return False
+            last_updated = cache_data.get('last_updated') or ''
+            if self._last_updated is not None and last_updated < self._last_updated:
+                return False
+            self.update(cache_data['data'])
+            self._source = cache_data
+            self._last_updated = last_updated
+            return True
+
+    def _within(self, west, south, east, north):
+        """(train id, lat, lng) of every train inside the box"""
+        min_row, min_col = self._cell(south, west)
+        max_row, max_col = self._cell(north, east)
+        found = []
+        with self._lock:
+            # Scan whichever is smaller: the covered cells or the occupied ones
+            if (max_row - min_row + 1) * (max_col - min_col + 1) <= len(self.cells):
+                cells = ((row, col) for row in range(min_row, max_row + 1)
+                         for col in range(min_col, max_col + 1))
+                candidates = (self.cells.get(cell, ()) for cell in cells)
+            else:
+                candidates = (members for (row, col), members in self.cells.items()
+                              if min_row <= row <= max_row and min_col <= col <= max_col)
+            for members in candidates:
+                for train_id in members:
+                    lat, lng, _ = self.positions[train_id]
+                    if south <= lat <= north and west <= lng <= east:
+                        found.append((train_id, lat, lng))
+        return found
+
+    def query_bbox(self, west, south, east, north):
+        """Ids of the trains inside the box, sorted"""
+        return sorted(train_id for train_id, _, _ in self._within(west, south, east, north))
+
+    def nearby(self, lat, lng, radius_km):
+        """(train id, distance km) within `radius_km` of a point, nearest first"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        results = []
+        for train_id, train_lat, train_lng in self._within(lng - dlng, lat - dlat,
+                                                           lng + dlng, lat + dlat):
+            distance = haversine_km(lat, lng, train_lat, train_lng)
+            if distance <= radius_km:
+                results.append((train_id, distance))
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+    def clusters(self, west, south, east, north, cluster_size):
+        """Group the trains inside the box into `cluster_size` degree cells
+
+        Returns one dict per non-empty cell with the centroid and count;
+        single-train clusters also carry the train id.
+        """
+        groups = {}
+        for train_id, lat, lng in self._within(west, south, east, north):
+            key = (math.floor(lat / cluster_size), math.floor(lng / cluster_size))
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [lat, lng, 1, train_id]
+            else:
+                group[0] += lat
+                group[1] += lng
+                group[2] += 1
+
+        clusters = []
+        for key in sorted(groups):
+            lat_sum, lng_sum, count, first_id = groups[key]
+            cluster = {"lat": lat_sum / count, "lng": lng_sum / count, "count": count}
+            if count == 1:
+                cluster["train_id"] = first_id
+            clusters.append(cluster)
+        return clusters
@@ -0,0 +1,181 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from timetable import (DEFAULT_RECOVERY_PER_HOUR, MINUTES_PER_DAY,
+                       current_stop_index, format_minutes, propagate_delay, route_minutes)
+
+BOARD_KINDS = ('arrivals', 'departures')
+BISECT_MAX_CHANGES = 64  # per station and refresh; more changes rebuild its lists
+
+
+def _route_signature(route):
+    return tuple((stop['station'], stop['time'], stop['status']) for stop in route)
+
+
+class StationBoardIndex:
+    """Per-station stop lists sorted by expected time, updated per changed train
+
+    Each station keeps the expected minute of day (scheduled time plus the
+    propagated delay) of every stop there in a sorted list, with the board
+    rows in a parallel list, so a time window is two bisects and a slice.
+    A refresh only removes and re-inserts the stops of trains whose route,
+    status or delay changed, on copies of the affected stations' lists, so
+    readers never see a half-applied update. Every station also has a
+    generation entry that is replaced only when one of its stops changes:
+    response bodies cached against it survive refreshes that did not touch
+    the station.
+    """
+
+    def __init__(self, recovery_per_hour=DEFAULT_RECOVERY_PER_HOUR):
+        self.recovery_per_hour = recovery_per_hour
+        self._boards = {}                # station -> (sorted expected minutes of day, rows)
+        self._trains = {}                # train id -> (head fields, route, stops)
+        self._generations = {}           # station -> generation entry
+        self._lookup = {}                # lowercased station -> station
+        self._source = None
+        self._last_updated = None
+        self._lock = threading.Lock()
+
+    def _stops(self, train):
+        """(station, expected minute of day, row) for every stop of a train
+
+        Rows carry the same predictions as `Timetable`: running times come
+        from the route unwrapped past midnight, departed stops have no
+        predicted time or delay.
+        """
+        route = train['route']
+        minutes = route_minutes(route)
+        current = current_stop_index(train)
+        last = len(route) - 1
+        stops = []
+        for i, route_stop in enumerate(route):
+            if i < current:
+                status, delay, predicted_time = 'departed', None, None
+                expected = minutes[i]
+            else:
+                status = 'current' if i == current else 'upcoming'
+                delay = int(propagate_delay(train['delay_minutes'], minutes[i] - minutes[current],
+                                            self.recovery_per_hour))
+                expected = minutes[i] + delay
+                predicted_time = format_minutes(expected)
+            stops.append((route_stop['station'], expected % MINUTES_PER_DAY, {
+                "train_id": train['id'],
+                "name": train['name'],
+                "type": train['type'],
+                "from_station": train['from_station'],
+                "to_station": train['to_station'],
+                "kind": 'origin' if i == 0 else 'terminus' if i == last else 'stop',
+                "scheduled_time": route_stop['time'],
+                "predicted_time": predicted_time,
+                "predicted_delay": delay,
+                "status": status
+            }))
+        return stops
+
+    @staticmethod
+    def _apply(times, rows, removed, added):
+        """New (times, rows) of a station with rows removed and (minute, row) pairs added"""
+        times, rows = list(times), list(rows)
+        if len(removed) + len(added) <= BISECT_MAX_CHANGES:
+            for minute, row in removed:
+                i = bisect_left(times, minute)
+                while rows[i] is not row:
+                    i += 1
+                del times[i]
+                del rows[i]
+            for minute, row in added:
+                i = bisect_right(times, minute)
+                times.insert(i, minute)
+                rows.insert(i, row)
+            return times, rows
+        # Many changes: filter and merge instead of shifting the lists per stop
+        removed_ids = {id(row) for _, row in removed}
+        entries = [entry for entry in zip(times, rows) if id(entry[1]) not in removed_ids]
+        entries.extend(added)
+        entries.sort(key=lambda entry: entry[0])
+        return [minute for minute, _ in entries], [row for _, row in entries]
+
+    def update(self, trains, last_updated=None):
+        """Apply a trains snapshot; returns the stations whose boards changed"""
+        changes = defaultdict(lambda: ([], []))  # station -> (removed, added) (minute, row) pairs
+
+        seen = set()
+        for train in trains:
+            seen.add(train['id'])
+            route = train['route']
+            head = (train['name'], train['type'], train['from_station'], train['to_station'],
+                    train['delay_minutes'])
+            previous = self._trains.get(train['id'])
+            if previous is not None and previous[0] == head:
+                # Snapshots usually share unchanged route lists; compare contents otherwise
+                if previous[1] is route:
+                    continue
+                if _route_signature(previous[1]) == _route_signature(route):
+                    self._trains[train['id']] = (head, route, previous[2])
+                    continue
+            for station, minute, row in previous[2] if previous is not None else ():
+                changes[station][0].append((minute, row))
+            stops = self._stops(train)
+            for station, minute, row in stops:
+                changes[station][1].append((minute, row))
+            self._trains[train['id']] = (head, route, stops)
+
+        for train_id in [train_id for train_id in self._trains if train_id not in seen]:
+            for station, minute, row in self._trains.pop(train_id)[2]:
+                changes[station][0].append((minute, row))
+
+        # Each station's lists are replaced in one assignment, never edited in place
+        for station, (removed, added) in changes.items():
+            self._boards[station] = self._apply(*self._boards.get(station, ((), ())), removed, added)
+            self._lookup.setdefault(station.lower(), station)
+            self._generations[station] = {
+                'cache_type': f"board:{station}",
+                'last_updated': last_updated
+            }
+        return set(changes)
+
+    def observe(self, cache_data):
+        """Update from a trains cache entry unless it is older than the indexed one"""
+        if cache_data is self._source:
+            return False
+        with self._lock:
+            if cache_data is self._source:
+                return False
+            last_updated = cache_data.get('last_updated') or ''
+            if self._last_updated is not None and last_updated < self._last_updated:
+                return False
+            self.update(cache_data['data'], last_updated)
+            self._source = cache_data
+            self._last_updated = last_updated
+            return True
+
+    def stations(self):
+        """Sorted names of the stations with at least one stop"""
+        return sorted(station for station, (times, _) in self._boards.items() if times)
+
+    def lookup(self, name):
+        """Station name as indexed (case-insensitive match), or None"""
+        for station in (name, self._lookup.get(name.lower())):
+            if station is not None and self._boards.get(station, ((),))[0]:
+                return station
+        return None
+
+    def generation(self, station):
+        """Cache entry standing for the current board contents of a station"""
+        return self._generations[station]
+
+    def board(self, station, start, window, kind=None):
+        """Rows expected at a station within [start, start + window] minutes of the day
+
+        Departed stops are left out; `kind` 'arrivals' leaves out trains
+        starting there, 'departures' trains ending there.
+        """
+        times, rows = self._boards.get(station, ([], []))
+        end = start + window
+        selected = rows[bisect_left(times, start):bisect_right(times, end)]
+        if end >= MINUTES_PER_DAY:
+            # Window past midnight
+            selected = selected + rows[:bisect_right(times, end - MINUTES_PER_DAY)]
+        excluded = {'arrivals': 'origin', 'departures': 'terminus'}.get(kind)
+        return [row for row in selected if row['status'] != 'departed' and row['kind'] != excluded]
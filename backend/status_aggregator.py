@@ -0,0 +1,149 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+DELAY_BUCKETS = (0, 1, 6, 16, 31)  # minutes: on time, 1-5, 6-15, 16-30, over 30
+DELAY_BUCKET_LABELS = ('0', '1-5', '6-15', '16-30', '30+')
+
+
+class _Group:
+    """Running counters for one train type or station"""
+
+    __slots__ = ('total', 'delayed', 'delay_sum')
+
+    def __init__(self):
+        self.total = 0
+        self.delayed = 0
+        self.delay_sum = 0
+
+    def add(self, status, delay, sign):
+        self.total += sign
+        self.delayed += sign if status == 'delayed' else 0
+        self.delay_sum += sign * delay
+
+    def summary(self):
+        return {
+            "total": self.total,
+            "delayed": self.delayed,
+            "average_delay": round(self.delay_sum / self.total, 2) if self.total else 0
+        }
+
+
+class StatusAggregator:
+    """Fleet statistics kept up to date incrementally between snapshots
+
+    Only trains whose type, current station, status or delay changed touch
+    the counters. Delays live in a NumPy array with one slot per train, so
+    percentiles and the delay histogram are computed in one vectorized pass.
+    """
+
+    def __init__(self, percentiles=DEFAULT_PERCENTILES):
+        self.percentiles = percentiles
+        self.status_counts = defaultdict(int)
+        self.on_time = 0
+        self.by_type = defaultdict(_Group)
+        self.by_station = defaultdict(_Group)
+        self._state = {}  # train id -> (slot, type, station, status, delay)
+        self._delays = np.zeros(64, dtype=np.float64)
+        self._active = np.zeros(64, dtype=bool)
+        self._free_slots = []
+        self._next_slot = 0
+        self._source = None
+        self._last_updated = None
+        self._lock = threading.Lock()
+
+    def _slot(self):
+        if self._free_slots:
+            return self._free_slots.pop()
+        slot = self._next_slot
+        self._next_slot += 1
+        if slot >= len(self._delays):
+            self._delays = np.resize(self._delays, len(self._delays) * 2)
+            active = np.zeros(len(self._delays), dtype=bool)
+            active[:len(self._active)] = self._active
+            self._active = active
+        return slot
+
+    def _count(self, train_type, station, status, delay, sign):
+        self.status_counts[status] += sign
+        self.on_time += sign if delay == 0 else 0
+        self.by_type[train_type].add(status, delay, sign)
+        self.by_station[station].add(status, delay, sign)
+
+    def update(self, trains):
+        """Apply a new snapshot; returns the number of trains that changed"""
+        changed = 0
+        seen = set()
+        for train in trains:
+            train_id = train['id']
+            seen.add(train_id)
+            key = (train['type'], train['current_station'], train['status'], train['delay_minutes'])
+            old = self._state.get(train_id)
+            if old is not None:
+                if old[1:] == key:
+                    continue
+                slot = old[0]
+                self._count(*old[1:], -1)
+            else:
+                slot = self._slot()
+                self._active[slot] = True
+            self._count(*key, 1)
+            self._delays[slot] = key[3]
+            self._state[train_id] = (slot,) + key
+            changed += 1
+
+        for train_id in [i for i in self._state if i not in seen]:
+            old = self._state.pop(train_id)
+            self._count(*old[1:], -1)
+            self._active[old[0]] = False
+            self._free_slots.append(old[0])
+            changed += 1
+        return changed
+
+    def observe(self, cache_data):
+        """Update from a trains cache entry unless it is older than the current one"""
+        if cache_data is self._source:
+            return False
+        with self._lock:
+            if cache_data is self._source:
+                return False
+            last_updated = cache_data.get('last_updated') or ''
+            if self._last_updated is not None and last_updated < self._last_updated:
+                return False
+            self.update(cache_data['data'])
+            self._source = cache_data
+            self._last_updated = last_updated
+            return True
+
+    def delay_summary(self):
+        """Average, maximum, percentiles and histogram of the current delays"""
+        delays = self._delays[:self._next_slot][self._active[:self._next_slot]]
+        if not len(delays):
+            return {"average": None, "max": None,
+                    "percentiles": {f"p{p}": None for p in self.percentiles},
+                    "buckets": dict.fromkeys(DELAY_BUCKET_LABELS, 0)}
+        buckets = np.bincount(np.digitize(delays, DELAY_BUCKETS) - 1, minlength=len(DELAY_BUCKETS))
+        return {
+            "average": round(float(delays.mean()), 2),
+            "max": int(delays.max()),
+            "percentiles": dict(zip((f"p{p}" for p in self.percentiles),
+                                    np.percentile(delays, self.percentiles).round(2).tolist())),
+            "buckets": dict(zip(DELAY_BUCKET_LABELS, buckets.tolist()))
+        }
+
+    def summary(self):
+        """Counters and breakdowns of the last observed snapshot"""
+        with self._lock:
+            return {
+                "total_trains": len(self._state),
+                "running_trains": self.status_counts.get('running', 0),
+                "delayed_trains": self.status_counts.get('delayed', 0),
+                "on_time_trains": self.on_time,
+                "delays": self.delay_summary(),
+                "by_type": {name: group.summary() for name, group in sorted(self.by_type.items())
+                            if group.total},
+                "by_station": {name: group.summary() for name, group in sorted(self.by_station.items())
+                               if group.total}
+            }
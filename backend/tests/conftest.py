@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def _train(train_id, stops, delay_minutes=0, current=0, position=(47.5, 19.0), status=None):
+    """Train dict in the MOCK_TRAINS shape from (station, 'HH:MM') stops
+
+    Stops before index `current` are departed, the one at it current.
+    """
+    route = [{"station": station, "time": time,
+              "status": "departed" if i < current else "current" if i == current else "upcoming"}
+             for i, (station, time) in enumerate(stops)]
+    return {
+        "id": train_id,
+        "name": f"Train {train_id}",
+        "type": "InterCity",
+        "from_station": route[0]['station'],
+        "to_station": route[-1]['station'],
+        "departure_time": route[0]['time'],
+        "arrival_time": route[-1]['time'],
+        "current_station": route[current]['station'],
+        "delay_minutes": delay_minutes,
+        "status": status or ("delayed" if delay_minutes > 5 else "running"),
+        "position": {"lat": position[0], "lng": position[1]},
+        "route": route
+    }
+
+
+@pytest.fixture
+def make_train():
+    return _train
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module, run from a temporary directory
+
+    The app keeps its cache files in a `cache` directory relative to the
+    working directory, so the whole session runs from a scratch one.
+    """
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        import app
+        yield app
+    finally:
+        os.chdir(cwd)
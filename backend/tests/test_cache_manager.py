@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_manager import CacheManager
+
+CALLERS = 8
+
+
+def _concurrent(func, count=CALLERS):
+    """Results of `count` calls of `func` released at the same moment"""
+    barrier = threading.Barrier(count)
+
+    def call():
+        barrier.wait()
+        return func()
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return [future.result() for future in [executor.submit(call) for _ in range(count)]]
+
+
+class SlowProducer:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.running = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.running.set()
+        time.sleep(self.delay)
+        return [{"id": f"T{self.calls}"}]
+
+
+def test_get_or_compute_runs_producer_once_without_stale_entry(tmp_path):
+    cache_manager = CacheManager(cache_dir=str(tmp_path))
+    producer = SlowProducer()
+
+    results = _concurrent(lambda: cache_manager.get_or_compute('trains', producer))
+
+    assert producer.calls == 1
+    assert sum(computed for _, computed in results) == 1
+    # Everyone waited for the single fresh entry
+    assert all(cache_data is results[0][0] for cache_data, _ in results)
+    assert results[0][0]['data'] == [{"id": "T1"}]
+
+
+def test_get_or_compute_serves_stale_entry_while_recomputing(tmp_path):
+    cache_manager = CacheManager(cache_dir=str(tmp_path))
+    stale, computed = cache_manager.get_or_compute('trains', lambda: [{"id": "old"}])
+    assert computed
+    cache_manager.cache_expiry['trains'] = 0
+
+    producer = SlowProducer(delay=0.5)
+    refresher = threading.Thread(target=cache_manager.get_or_compute, args=('trains', producer))
+    refresher.start()
+    assert producer.running.wait(5)
+
+    started = time.monotonic()
+    results = _concurrent(lambda: cache_manager.get_or_compute('trains', producer))
+    elapsed = time.monotonic() - started
+    refresher.join()
+
+    assert producer.calls == 1
+    assert elapsed < producer.delay
+    assert all(not computed and cache_data['data'] == stale['data'] for cache_data, computed in results)
+
+
+def test_get_or_compute_hits_fresh_entry(tmp_path):
+    cache_manager = CacheManager(cache_dir=str(tmp_path))
+    producer = SlowProducer(delay=0)
+    first, computed = cache_manager.get_or_compute('status', producer)
+    second, computed_again = cache_manager.get_or_compute('status', producer)
+
+    assert (computed, computed_again) == (True, False)
+    assert second is first
+    assert producer.calls == 1
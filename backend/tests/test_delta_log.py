@@ -0,0 +1,100 @@
+from delta_log import DeltaLog, version_token
+
+
+def _snapshot(version, items):
+    """Cache entry and (key, item) pairs of one snapshot"""
+    cache_data = {'cache_type': 'trains', 'last_updated': f"2024-01-01T00:00:{version:02d}"}
+    return cache_data, [(item['id'], item) for item in items]
+
+
+def _observe(log, version, items):
+    assert log.observe(*_snapshot(version, items))
+    return log.token()
+
+
+def test_changes_since_collapses_diffs():
+    log = DeltaLog(size=5)
+    token = _observe(log, 0, [{"id": "A", "delay": 0}, {"id": "B", "delay": 0}])
+    _observe(log, 1, [{"id": "A", "delay": 3}, {"id": "B", "delay": 0}, {"id": "C", "delay": 0}])
+    _observe(log, 2, [{"id": "A", "delay": 3}, {"id": "C", "delay": 1}])
+
+    changes = log.changes_since(token)
+
+    assert changes['version'] == log.token()
+    assert set(changes['added']) == {"C"}
+    assert set(changes['changed']) == {"A"}
+    assert set(changes['removed']) == {"B"}
+    assert changes['count'] == 2
+
+
+def test_removed_then_readded_item_is_a_change():
+    log = DeltaLog(size=5)
+    token = _observe(log, 0, [{"id": "A", "delay": 0}])
+    _observe(log, 1, [])
+    _observe(log, 2, [{"id": "A", "delay": 0}])
+
+    changes = log.changes_since(token)
+
+    assert set(changes['changed']) == {"A"}
+    assert not changes['added'] and not changes['removed']
+
+
+def test_tokens_outside_the_ring_buffer_need_a_full_response():
+    log = DeltaLog(size=3)
+    tokens = [_observe(log, version, [{"id": "A", "delay": version}]) for version in range(6)]
+
+    # Tokens are versions 1-6; the buffer keeps the diffs to versions 4, 5 and 6
+    assert log.changes_since(tokens[1]) is None
+    assert log.changes_since(tokens[2]) is not None
+    assert set(log.changes_since(tokens[4])['changed']) == {"A"}
+    current = log.changes_since(tokens[-1])
+    assert not current['added'] and not current['changed'] and not current['removed']
+
+
+def test_logs_observing_the_same_snapshots_share_tokens():
+    # Two workers loading the same snapshots, one of them skipping version 1
+    log, other = DeltaLog(), DeltaLog()
+    first = _observe(log, 0, [{"id": "A", "delay": 0}])
+    _observe(log, 1, [{"id": "A", "delay": 1}])
+    _observe(log, 2, [{"id": "A", "delay": 2}, {"id": "B", "delay": 0}])
+    assert _observe(other, 0, [{"id": "A", "delay": 0}]) == first
+    _observe(other, 2, [{"id": "A", "delay": 2}, {"id": "B", "delay": 0}])
+
+    assert other.token() == log.token()
+    assert other.changes_since(first) == log.changes_since(first)
+    # A version the other worker never saw needs a full response there
+    assert log.changes_since(version_token("2024-01-01T00:00:01")) is not None
+    assert other.changes_since(version_token("2024-01-01T00:00:01")) is None
+
+
+def test_tokens_sort_by_snapshot_time():
+    assert version_token("2024-01-01T00:00:09") < version_token("2024-01-01T00:00:10.5")
+    assert version_token("2024-01-01T00:00:10") == "20240101000010000000"
+
+
+def test_unknown_and_malformed_tokens_need_a_full_response():
+    log = DeltaLog()
+    assert log.changes_since(log.token()) is None  # nothing observed yet
+    _observe(log, 0, [{"id": "A"}])
+
+    assert log.changes_since(version_token("2024-01-01T00:00:59")) is None
+    assert log.changes_since("garbage") is None
+    assert log.changes_since(None) is None
+
+
+def test_older_snapshots_are_ignored():
+    log = DeltaLog()
+    _observe(log, 5, [{"id": "A"}])
+    token = log.token()
+
+    assert not log.observe(*_snapshot(4, [{"id": "B"}]))
+    assert log.token() == token
+    assert [item['id'] for item in log.snapshot()[1]] == ["A"]
+
+
+def test_ignored_fields_do_not_count_as_changes():
+    log = DeltaLog(ignore_fields=('timestamp',))
+    token = _observe(log, 0, [{"id": "A", "timestamp": 1}])
+    _observe(log, 1, [{"id": "A", "timestamp": 2}])
+
+    assert not log.changes_since(token)['changed']
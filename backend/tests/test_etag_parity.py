@@ -0,0 +1,104 @@
+"""The Flask and ASGI apps give the same body the same ETag
+
+Clients (and shared caches in front of several workers) revalidate against
+whichever app answers, so an ETag from one has to match in the other.
+"""
+
+import asyncio
+
+import pytest
+
+from delta_log import DeltaLog, version_token
+
+ENDPOINTS = ['/api/trains', '/api/trains?since={since}', '/api/positions',
+             '/api/positions?since={positions_since}', '/api/status', '/api/stations']
+
+
+def asgi_get(asgi_app, url, headers=()):
+    """(status, headers) of a GET through the ASGI app"""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode('latin-1'),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start = messages[0]
+    return start['status'], {name.decode('latin-1'): value.decode('latin-1')
+                             for name, value in start['headers']}
+
+
+@pytest.fixture(scope='module')
+def apps(app_module):
+    """(Flask test client, ASGI app, URL parameters), with every cache entry warm
+
+    Entries never expire during the test, so no request regenerates one and
+    renders its own, uncached body.
+    """
+    import asgi
+
+    expiry = dict(app_module.cache_manager.cache_expiry)
+    app_module.cache_manager.cache_expiry.update(dict.fromkeys(expiry, float('inf')))
+    app_module.refresh_all_cache()
+    since = app_module.trains_log.token()
+    positions_since = app_module.positions_log.token()
+    app_module.refresh_trains()
+    params = {'since': since, 'positions_since': positions_since}
+    try:
+        yield app_module.app.test_client(), asgi.app, params
+    finally:
+        app_module.cache_manager.cache_expiry.update(expiry)
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip'])
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_same_etag_from_both_apps(apps, endpoint, encoding):
+    client, asgi_app, params = apps
+    url = endpoint.format(**params)
+    headers = [('Accept-Encoding', encoding)]
+
+    flask_response = client.get(url, headers=headers)
+    status, asgi_headers = asgi_get(asgi_app, url, headers)
+
+    assert flask_response.status_code == status == 200
+    assert flask_response.headers['ETag']
+    assert asgi_headers['etag'] == flask_response.headers['ETag']
+    assert asgi_headers.get('content-encoding') == flask_response.headers.get('Content-Encoding')
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_etag_from_one_app_revalidates_in_the_other(apps, endpoint):
+    client, asgi_app, params = apps
+    url = endpoint.format(**params)
+
+    flask_etag = client.get(url).headers['ETag']
+    status, asgi_headers = asgi_get(asgi_app, url, [('If-None-Match', flask_etag)])
+    assert status == 304
+
+    response = client.get(url, headers={'If-None-Match': asgi_headers['etag']})
+    assert response.status_code == 304
+
+
+def test_body_version_is_the_one_of_the_entry_behind_the_etag(apps, app_module, monkeypatch):
+    client, _, _ = apps
+    # A log already past the entry, like one that observed a newer snapshot meanwhile
+    log = DeltaLog()
+    log.observe({'cache_type': 'trains', 'last_updated': '2999-01-01T00:00:00'}, [])
+    monkeypatch.setattr(app_module, 'trains_log', log)
+
+    response = client.get('/api/trains?status=running&fields=id,status')
+    cached_data = app_module.cache_manager.peek('trains')
+
+    assert response.json['last_updated'] == cached_data['last_updated']
+    assert response.json['version'] == version_token(cached_data['last_updated'])
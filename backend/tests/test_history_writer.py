@@ -0,0 +1,76 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from history_writer import HistoryWriter, sqlite_pool
+from producers import MOCK_TRAINS
+
+
+class FlakyPool:
+    """Pool whose next `failures` connections fail"""
+
+    def __init__(self, pool, failures=1):
+        self.pool = pool
+        self.paramstyle = pool.paramstyle
+        self.failures = failures
+
+    @contextmanager
+    def connection(self):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        with self.pool.connection() as conn:
+            yield conn
+
+    def close(self):
+        self.pool.close()
+
+
+def _rows(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT vehicle_id, timestamp FROM {table} ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_flush_writes_buffered_rows(tmp_path):
+    path = str(tmp_path / 'history.db')
+    writer = HistoryWriter(sqlite_pool(path))
+    writer.record_snapshot(MOCK_TRAINS, timestamp='2024-01-01 08:00:00')
+
+    assert writer.flush() == 2 * len(MOCK_TRAINS)
+    assert writer.flush() == 0
+    assert writer.rows_written == 2 * len(MOCK_TRAINS)
+    assert _rows(path, 'positions') == [(train['id'], '2024-01-01 08:00:00') for train in MOCK_TRAINS]
+    writer.close()
+
+
+def test_failed_flush_keeps_rows_in_order_for_the_retry(tmp_path):
+    path = str(tmp_path / 'history.db')
+    writer = HistoryWriter(FlakyPool(sqlite_pool(path)))
+    writer.record_snapshot(MOCK_TRAINS, timestamp='2024-01-01 08:00:00')
+
+    with pytest.raises(sqlite3.OperationalError):
+        writer.flush()
+    assert writer.rows_written == 0
+
+    # Rows recorded after the failure go behind the ones being retried
+    writer.record_snapshot(MOCK_TRAINS, timestamp='2024-01-01 08:00:30')
+    assert writer.flush() == 4 * len(MOCK_TRAINS)
+
+    expected = [(train['id'], timestamp) for timestamp in ('2024-01-01 08:00:00', '2024-01-01 08:00:30')
+                for train in MOCK_TRAINS]
+    assert _rows(path, 'positions') == expected
+    assert _rows(path, 'trains') == expected
+    writer.close()
+
+
+def test_full_buffer_drops_the_oldest_rows(tmp_path):
+    writer = HistoryWriter(sqlite_pool(str(tmp_path / 'history.db')), flush_size=100, max_buffer=3)
+    writer.record_positions([(f"T{i}", 47.5, 19.0, 0, '2024-01-01 08:00:00') for i in range(5)])
+
+    assert writer.rows_dropped == 2
+    assert [row[0] for row in writer._buffers['positions']] == ["T2", "T3", "T4"]
+    writer.close()
@@ -0,0 +1,166 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cache_manager import CacheManager
+from ingestion import EmmaSource, IngestionError, IngestionWorker, StaticSource
+from producers import MOCK_TRAINS
+from train_records import LiveTrainRecord
+
+DAY_END = 24 * 3600 - 1  # realtimeDeparture still ahead at any time of day
+
+
+def _vehicle(vehicle_id, delay_seconds=0):
+    return {
+        "vehicleId": vehicle_id,
+        "lat": 47.5,
+        "lon": 19.08,
+        "label": "IC 600",
+        "speed": 25.0,
+        "heading": 90,
+        "trip": {
+            "tripShortName": "IC 600",
+            "tripHeadsign": "Debrecen",
+            "stoptimes": [
+                {"stop": {"name": "Budapest-Nyugati"}, "scheduledArrival": 8 * 3600,
+                 "realtimeArrival": 8 * 3600, "realtimeDeparture": DAY_END,
+                 "arrivalDelay": delay_seconds},
+                {"stop": {"name": "Debrecen"}, "scheduledArrival": 10 * 3600 + 30 * 60,
+                 "realtimeArrival": DAY_END, "realtimeDeparture": DAY_END,
+                 "arrivalDelay": delay_seconds},
+            ]
+        }
+    }
+
+
+@pytest.fixture
+def emma_server():
+    """Stub EMMA GraphQL server; set `server.payload` to what it should answer"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            server.queries.append(request['query'])
+            body = json.dumps(server.payload).encode('utf-8')
+            self.send_response(server.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.payload = {"data": {"vehiclePositions": []}}
+    server.status = 200
+    server.queries = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/graphql"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_static_source_returns_a_copy():
+    source = StaticSource(MOCK_TRAINS)
+    trains = source.fetch()
+    assert trains == MOCK_TRAINS
+    assert trains is not source.trains
+
+
+def test_emma_source_normalizes_vehicles(emma_server):
+    emma_server.payload = {"data": {"vehiclePositions": [
+        _vehicle("v1", delay_seconds=12 * 60),
+        {"vehicleId": "no-position", "lat": None, "lon": None},
+    ]}}
+
+    trains = EmmaSource(emma_server.url, timeout=5).fetch()
+
+    assert len(emma_server.queries) == 1
+    assert [train['id'] for train in trains] == ["v1"]
+    train = trains[0]
+    assert isinstance(train, LiveTrainRecord)
+    assert train['name'] == "IC 600 Debrecen"
+    assert train['from_station'] == "Budapest-Nyugati"
+    assert train['to_station'] == "Debrecen"
+    assert train['departure_time'] == "08:00"
+    assert train['arrival_time'] == "10:30"
+    assert train['current_station'] == "Budapest-Nyugati"
+    assert [stop['status'] for stop in train['route']] == ["current", "upcoming"]
+    assert train['delay_minutes'] == 12
+    assert train['status'] == "delayed"
+    assert train['speed'] == 90  # m/s -> km/h
+    assert (train['position']['lat'], train['position']['lng']) == (47.5, 19.08)
+
+
+@pytest.mark.parametrize('payload', [
+    {"errors": [{"message": "boom"}]},
+    {"data": {}},
+])
+def test_emma_source_rejects_unusable_responses(emma_server, payload):
+    emma_server.payload = payload
+    with pytest.raises(IngestionError):
+        EmmaSource(emma_server.url, timeout=5).fetch()
+
+
+def test_worker_stores_snapshot_and_notifies(emma_server, tmp_path):
+    emma_server.payload = {"data": {"vehiclePositions": [_vehicle("v1"), _vehicle("v2")]}}
+    cache_manager = CacheManager(cache_dir=str(tmp_path))
+    updates = []
+    worker = IngestionWorker(EmmaSource(emma_server.url, timeout=5), cache_manager,
+                             on_update=updates.append, interval=30)
+
+    cache_data = worker.poll_once()
+
+    assert [train['id'] for train in cache_data['data']] == ["v1", "v2"]
+    assert updates == [cache_data]
+    assert cache_manager.peek('trains') is cache_data
+    assert worker.last_success is not None
+
+
+def test_worker_backs_off_after_failures(emma_server, tmp_path):
+    emma_server.status = 503
+    worker = IngestionWorker(EmmaSource(emma_server.url, timeout=5), CacheManager(cache_dir=str(tmp_path)),
+                             interval=30, retry_delay=5, max_backoff=60)
+    worker.start()
+    try:
+        for _ in range(100):
+            if worker.failures:
+                break
+            worker._stop.wait(0.05)
+    finally:
+        worker.stop(timeout=5)
+
+    assert worker.failures == 1
+    assert 2.5 <= worker.next_delay() <= 5
+    worker.failures = 10
+    assert 30 <= worker.next_delay() <= 60  # capped at max_backoff
+    worker.failures = 0
+    assert worker.next_delay() == 30
+
+
+def test_requests_never_rebuild_an_ingested_snapshot(app_module, monkeypatch):
+    updates = []
+
+    def on_update(cache_data):
+        updates.append(cache_data)
+        app_module.on_trains_updated(cache_data)
+
+    worker = IngestionWorker(StaticSource(MOCK_TRAINS), app_module.cache_manager, on_update=on_update)
+    monkeypatch.setattr(app_module, 'ingestion_worker', worker)
+    polled = worker.poll_once()
+    token = app_module.trains_log.token()
+    monkeypatch.setitem(app_module.cache_manager.cache_expiry, 'trains', 0)
+
+    for _ in range(3):
+        cached_data, computed = app_module.load_trains()
+        assert not computed
+        assert cached_data['last_updated'] == polled['last_updated']
+    response = app_module.app.test_client().get('/api/trains')
+
+    assert response.json['last_updated'] == polled['last_updated']
+    assert updates == [polled]
+    assert app_module.trains_log.token() == token
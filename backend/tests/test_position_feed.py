@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+import pytest
+
+from position_feed import HEADER, MAGIC, RECORD, UNKNOWN_STATUS, PositionFeed
+
+
+def _position(lat, lng, delay=0, status='running'):
+    return {"position": {"lat": lat, "lng": lng}, "delay_minutes": delay, "status": status}
+
+
+def _decode(body):
+    magic, count, key = HEADER.unpack_from(body)
+    records = np.frombuffer(body, dtype=RECORD, offset=HEADER.size)
+    assert magic == MAGIC
+    assert len(records) == count
+    return key, records
+
+
+@pytest.fixture
+def positions():
+    return {
+        "S2": _position(46.25, 20.15, delay=12, status='delayed'),
+        "IC1": _position(47.5, 19.04),
+        "R9": _position(47.68, 17.63, delay=100000, status='cancelled'),
+    }
+
+
+def test_body_has_one_record_per_train_in_id_order(positions):
+    feed = PositionFeed(positions)
+    key, records = _decode(feed.body)
+
+    assert feed.ids == ["IC1", "R9", "S2"]
+    assert key == feed.key
+    assert len(feed.body) == HEADER.size + 3 * RECORD.itemsize
+    assert records['idx'].tolist() == [0, 1, 2]
+    assert records['lat'].tolist() == pytest.approx([47.5, 47.68, 46.25], abs=1e-5)
+    assert records['lng'].tolist() == pytest.approx([19.04, 17.63, 20.15], abs=1e-5)
+    assert records['status'].tolist() == [0, UNKNOWN_STATUS, 1]
+    assert records['delay'].tolist() == [0, np.iinfo(np.int16).max, 12]  # clipped
+
+
+def test_id_dictionary_is_keyed_by_the_set_of_trains(positions):
+    feed = PositionFeed(positions)
+    dictionary = json.loads(feed.dictionary.body)
+
+    assert dictionary == {"success": True, "key": feed.key.hex(), "ids": feed.ids}
+    assert feed.dictionary.etag == f"ids-{feed.key.hex()}"
+
+    moved = dict(positions, IC1=_position(47.6, 19.1, delay=3))
+    assert PositionFeed(moved).key == feed.key
+    assert PositionFeed(moved).body != feed.body
+
+    fewer = {train_id: position for train_id, position in positions.items() if train_id != "R9"}
+    assert PositionFeed(fewer).key != feed.key
+
+
+def test_bbox_body_keeps_only_trains_inside(positions):
+    feed = PositionFeed(positions)
+
+    key, records = _decode(feed.encode_bbox(18.5, 47.0, 20.5, 48.0))
+
+    assert key == feed.key
+    assert [feed.ids[idx] for idx in records['idx'].tolist()] == ["IC1"]
+    assert _decode(feed.encode_bbox(0, 0, 1, 1))[1].size == 0
+
+
+def test_from_cache_reads_the_positions_entry(positions):
+    feed = PositionFeed.from_cache({'cache_type': 'positions', 'data': positions})
+    assert feed.body == PositionFeed(positions).body
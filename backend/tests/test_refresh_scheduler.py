@@ -0,0 +1,76 @@
+import threading
+import time
+
+from refresh_scheduler import RefreshScheduler
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_slow_job_is_skipped_instead_of_overlapping():
+    active, overlaps = [0], []
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            active[0] += 1
+            overlaps.append(active[0] > 1)
+        time.sleep(0.3)
+        with lock:
+            active[0] -= 1
+
+    scheduler = RefreshScheduler(max_workers=4, jitter=0)
+    job = scheduler.add('slow', slow, interval=0.05)
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: job.runs >= 2)
+    finally:
+        scheduler.stop()
+
+    assert not any(overlaps)
+    metrics = scheduler.metrics()['slow']
+    assert metrics['skipped'] > 0
+    assert metrics['runs'] >= 2
+    assert metrics['max_duration'] >= 0.3
+
+
+def test_busy_pool_shows_up_as_lag():
+    scheduler = RefreshScheduler(max_workers=1, jitter=0)
+    scheduler.add('blocker', lambda: time.sleep(0.3), interval=10)
+    fast = scheduler.add('fast', lambda: None, interval=10, delay=0.05)
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: fast.runs >= 1)
+    finally:
+        scheduler.stop()
+
+    # Due after 0.05s, but the only worker was busy until 0.3s
+    assert scheduler.metrics()['fast']['last_lag'] >= 0.2
+    assert fast.max_lag == fast.last_lag
+
+
+def test_failures_are_counted_and_the_job_keeps_running():
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    scheduler = RefreshScheduler(max_workers=1, jitter=0)
+    job = scheduler.add('failing', failing, interval=0.02)
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: job.runs >= 3)
+    finally:
+        scheduler.stop()
+
+    metrics = scheduler.metrics()['failing']
+    assert metrics['failures'] == metrics['runs']
+    assert metrics['last_error'] == "upstream down"
+    assert metrics['last_success'] is None
@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.mark.parametrize('limit', ['-5', '0', '1001', 'many'])
+def test_search_rejects_out_of_range_limits(app_module, limit):
+    response = app_module.app.test_client().get(f'/api/search?q=ic&limit={limit}')
+
+    assert response.status_code == 400
+    assert response.json == {"success": False, "error": "limit must be between 1 and 1000"}
+
+
+def test_search_echoes_the_limit_it_applied(app_module):
+    client = app_module.app.test_client()
+
+    assert client.get('/api/search?q=ic').json['limit'] == 50
+    response = client.get('/api/search?q=ic&limit=1')
+    assert response.status_code == 200
+    assert (response.json['limit'], response.json['count']) == (1, 1)
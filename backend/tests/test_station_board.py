@@ -0,0 +1,104 @@
+from station_board import StationBoardIndex
+from timetable import MINUTES_PER_DAY, Timetable
+
+
+def _ids(rows):
+    return [row['train_id'] for row in rows]
+
+
+def _trains(make_train, delay=0):
+    return [
+        make_train("IC1", [("Budapest-Keleti", "09:00"), ("Szolnok", "10:00"), ("Debrecen", "11:00")],
+                   delay_minutes=delay),
+        make_train("IC2", [("Budapest-Keleti", "09:30"), ("Szolnok", "10:30"), ("Debrecen", "11:30")]),
+        make_train("R3", [("Cegléd", "09:10"), ("Kecskemét", "09:50")]),
+    ]
+
+
+def test_board_lists_stops_in_a_window_by_expected_time(make_train):
+    index = StationBoardIndex()
+    assert index.update(_trains(make_train), 'v1') == {
+        "Budapest-Keleti", "Szolnok", "Debrecen", "Cegléd", "Kecskemét"}
+
+    assert _ids(index.board("Szolnok", 9 * 60 + 50, 60)) == ["IC1", "IC2"]
+    assert _ids(index.board("Szolnok", 10 * 60 + 15, 10)) == []
+    assert index.lookup("szolnok") == "Szolnok"
+    assert index.lookup("Nowhere") is None
+    assert index.stations() == sorted(["Budapest-Keleti", "Szolnok", "Debrecen", "Cegléd", "Kecskemét"])
+
+
+def test_delay_change_moves_only_the_affected_stations(make_train):
+    index = StationBoardIndex()
+    index.update(_trains(make_train), 'v1')
+    kecskemet = index.generation("Kecskemét")
+
+    changed = index.update(_trains(make_train, delay=45), 'v2')
+
+    assert changed == {"Budapest-Keleti", "Szolnok", "Debrecen"}
+    assert index.generation("Kecskemét") is kecskemet
+    assert index.generation("Szolnok")['last_updated'] == 'v2'
+    # 45 minutes late, minus 2 made up in the hour to Szolnok
+    rows = index.board("Szolnok", 10 * 60, 60)
+    assert _ids(rows) == ["IC2", "IC1"]
+    assert (rows[1]['predicted_time'], rows[1]['predicted_delay']) == ("10:43", 43)
+
+
+def test_departed_trains_and_kinds_are_filtered(make_train):
+    index = StationBoardIndex()
+    index.update([
+        make_train("IC1", [("Budapest-Keleti", "09:00"), ("Szolnok", "10:00"), ("Debrecen", "11:00")],
+                   current=2),
+        make_train("IC2", [("Szolnok", "10:10"), ("Debrecen", "11:10")]),
+        make_train("IC3", [("Budapest-Keleti", "09:20"), ("Szolnok", "10:20")]),
+    ])
+
+    assert _ids(index.board("Szolnok", 10 * 60, 60)) == ["IC2", "IC3"]
+    assert _ids(index.board("Szolnok", 10 * 60, 60, kind='arrivals')) == ["IC3"]
+    assert _ids(index.board("Szolnok", 10 * 60, 60, kind='departures')) == ["IC2"]
+
+
+def test_window_wraps_past_midnight_and_removed_trains_leave(make_train):
+    index = StationBoardIndex()
+    night = [
+        make_train("N1", [("Budapest-Keleti", "23:30"), ("Szolnok", "23:55"), ("Debrecen", "01:00")]),
+        make_train("N2", [("Budapest-Keleti", "23:45"), ("Szolnok", "00:10"), ("Debrecen", "01:15")]),
+    ]
+    index.update(night)
+
+    assert _ids(index.board("Szolnok", 23 * 60 + 50, 30)) == ["N1", "N2"]
+
+    assert index.update(night[:1]) == {"Budapest-Keleti", "Szolnok", "Debrecen"}
+    assert _ids(index.board("Szolnok", 23 * 60 + 50, 30)) == ["N1"]
+
+
+def test_observe_ignores_older_snapshots(make_train):
+    index = StationBoardIndex()
+    newer = {'last_updated': '2024-01-01T10:00:00', 'data': _trains(make_train)}
+    older = {'last_updated': '2024-01-01T09:59:00', 'data': []}
+
+    assert index.observe(newer)
+    assert not index.observe(newer)
+    assert not index.observe(older)
+    assert _ids(index.board("Szolnok", 9 * 60 + 50, 60)) == ["IC1", "IC2"]
+
+
+def test_board_predictions_match_the_timetable(make_train):
+    trains = [
+        make_train("N1", [("Budapest-Keleti", "22:30"), ("Szolnok", "23:55"), ("Debrecen", "01:40")],
+                   delay_minutes=30),
+        make_train("IC1", [("Budapest-Keleti", "09:00"), ("Szolnok", "10:00"), ("Debrecen", "11:00")],
+                   current=1, delay_minutes=5),
+    ]
+    index = StationBoardIndex()
+    index.update(trains)
+    timetable = Timetable(trains)
+
+    for train in trains:
+        for stop in timetable.train_predictions(train['id'])['route']:
+            rows = [row for row in index.board(stop['station'], 0, MINUTES_PER_DAY - 1)
+                    if row['train_id'] == train['id']]
+            if stop['predicted_time'] is None:
+                assert rows == []  # departed
+                continue
+            assert [(row['predicted_time'], row['predicted_delay']) for row in rows] == [
+                (stop['predicted_time'], stop['predicted_delay'])]
@@ -0,0 +1,45 @@
+from timetable import MINUTES_PER_DAY, Timetable, propagate_delay
+
+NIGHT_STOPS = [("Budapest-Keleti", "23:40"), ("Cegléd", "23:55"),
+               ("Szolnok", "00:20"), ("Debrecen", "00:45")]
+
+
+def test_stop_times_are_unwrapped_past_midnight(make_train):
+    timetable = Timetable([make_train("N1", NIGHT_STOPS, current=1)])
+
+    assert timetable.stop_minutes.tolist() == [23 * 60 + 40, 23 * 60 + 55,
+                                               MINUTES_PER_DAY + 20, MINUTES_PER_DAY + 45]
+
+
+def test_delay_propagates_across_midnight(make_train):
+    timetable = Timetable([make_train("N1", NIGHT_STOPS, delay_minutes=10, current=1)])
+
+    predictions = timetable.train_predictions("N1")
+
+    # 2 minutes made up per scheduled hour: 50 minutes after Cegléd, one is gone
+    assert [(stop['predicted_time'], stop['predicted_delay']) for stop in predictions['route']] == [
+        (None, None), ("00:05", 10), ("00:30", 10), ("00:54", 9)]
+    assert predictions['predicted_arrival'] == "00:54"
+    assert timetable.train_predictions("unknown") is None
+
+
+def test_departures_order_by_predicted_time(make_train):
+    timetable = Timetable([
+        make_train("early", [("Szolnok", "00:05"), ("Debrecen", "01:00")], delay_minutes=20),
+        make_train("late", [("Szolnok", "00:15"), ("Debrecen", "01:10")]),
+        make_train("gone", [("Cegléd", "23:30"), ("Szolnok", "23:50"), ("Debrecen", "00:40")],
+                   current=2),
+        make_train("ends", [("Cegléd", "23:50"), ("Szolnok", "00:10")]),
+    ])
+
+    total, board = timetable.departures(timetable.lookup_station("szolnok"))
+
+    # Departed and terminating trains are not departures
+    assert total == 2
+    assert [(row['train_id'], row['predicted_time']) for row in board] == [
+        ("late", "00:15"), ("early", "00:25")]
+
+
+def test_propagate_delay_never_gets_ahead_of_schedule():
+    assert propagate_delay(3, 180) == 0
+    assert propagate_delay(10, 30) == 9
@@ -0,0 +1,196 @@
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+STOP_STATUSES = ('departed', 'current', 'upcoming')
+DEFAULT_RECOVERY_PER_HOUR = 2  # minutes of delay made up per scheduled hour of running
+
+
+def propagate_delay(delay, elapsed, recovery_per_hour=DEFAULT_RECOVERY_PER_HOUR):
+    """Delay expected `elapsed` scheduled minutes after a stop where it is `delay`
+
+    Trains make up `recovery_per_hour` minutes per scheduled hour of running
+    (timetable slack), never getting ahead of schedule. Works on scalars
+    and NumPy arrays alike.
+    """
+    delay = delay - elapsed * recovery_per_hour // 60
+    return np.maximum(delay, 0) if isinstance(delay, np.ndarray) else max(delay, 0)
+
+
+def parse_minutes(hhmm):
+    """'HH:MM' -> minutes after midnight"""
+    return int(hhmm[:2]) * 60 + int(hhmm[3:5])
+
+
+def route_minutes(route):
+    """Scheduled minutes of a route's stops, unwrapped past midnight
+
+    A stop scheduled earlier than the one before it is on the next day, so
+    the minutes grow along the route and differences are running times.
+    """
+    minutes = []
+    previous = -1
+    day = 0
+    for route_stop in route:
+        stop_minutes = parse_minutes(route_stop['time']) + day
+        if stop_minutes < previous:
+            day += MINUTES_PER_DAY  # crossed midnight
+            stop_minutes += MINUTES_PER_DAY
+        previous = stop_minutes
+        minutes.append(stop_minutes)
+    return minutes
+
+
+def current_stop_index(train):
+    """Position in its route of the stop a train is at or heading to
+
+    The stop marked current, else the first upcoming one, else the stop at
+    `current_station`, else the last stop.
+    """
+    route = train['route']
+    upcoming = None
+    for i, route_stop in enumerate(route):
+        if route_stop['status'] == 'current':
+            return i
+        if upcoming is None and route_stop['status'] == 'upcoming':
+            upcoming = i
+    if upcoming is not None:
+        return upcoming
+    for i, route_stop in enumerate(route):
+        if route_stop['station'] == train['current_station']:
+            return i
+    return max(0, len(route) - 1)
+
+
+def format_minutes(minutes):
+    minutes = int(minutes) % MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class Timetable:
+    """Compiled stop times of one trains snapshot with predicted delays
+
+    All stops of all trains live in flat arrays, one train after the other
+    (`stop_offsets[i]:stop_offsets[i + 1]` are the stops of train i), with
+    scheduled times as integer minutes, unwrapped past midnight so they grow
+    along a route (`route_minutes`). The station index lists the stops at each station in
+    scheduled order. Built once per refresh of the trains cache; `predict`
+    propagates every train's current delay to its remaining stops in a
+    single vectorized pass.
+    """
+
+    def __init__(self, trains, recovery_per_hour=DEFAULT_RECOVERY_PER_HOUR):
+        self.trains = trains
+        self.recovery_per_hour = recovery_per_hour
+        self.index = {train['id']: i for i, train in enumerate(trains)}
+        self.stations = []
+        self.station_codes = {}
+
+        counts = np.fromiter((len(train['route']) for train in trains), dtype=np.int32,
+                             count=len(trains))
+        self.stop_offsets = np.zeros(len(trains) + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.stop_offsets[1:])
+        total = int(self.stop_offsets[-1])
+
+        self.stop_station = np.empty(total, dtype=np.int32)
+        self.stop_minutes = np.empty(total, dtype=np.int16)
+        self.current_stop = np.empty(len(trains), dtype=np.int32)  # global stop index
+        self.delays = np.fromiter((train['delay_minutes'] for train in trains), dtype=np.int16,
+                                  count=len(trains))
+
+        stop = 0
+        for i, train in enumerate(trains):
+            self.current_stop[i] = stop + current_stop_index(train)
+            for route_stop, minutes in zip(train['route'], route_minutes(train['route'])):
+                self.stop_minutes[stop] = minutes
+                self.stop_station[stop] = self._station_code(route_stop['station'])
+                stop += 1
+
+        self.stop_train = np.repeat(np.arange(len(trains), dtype=np.int32), counts)
+        self.is_terminal = np.zeros(total, dtype=bool)
+        self.is_terminal[self.stop_offsets[1:][counts > 0] - 1] = True
+
+        # Station -> its stops sorted by scheduled time
+        order = np.lexsort((self.stop_minutes, self.stop_station))
+        self.station_stops = order.astype(np.int32)
+        self.station_offsets = np.zeros(len(self.stations) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.stop_station, minlength=len(self.stations)),
+                  out=self.station_offsets[1:])
+
+        self.predict()
+
+    @classmethod
+    def from_cache(cls, cache_data):
+        return cls(cache_data['data'])
+
+    def _station_code(self, name):
+        code = self.station_codes.get(name)
+        if code is None:
+            code = self.station_codes[name] = len(self.stations)
+            self.stations.append(name)
+        return code
+
+    def predict(self):
+        """Predicted delay and arrival of every stop, for the whole fleet at once
+
+        The delay at the current stop carries over to the upcoming ones
+        (see `propagate_delay`). Departed stops get -1.
+        """
+        current = self.current_stop[self.stop_train]
+        stops = np.arange(len(self.stop_train), dtype=np.int32)
+        self.stop_status = np.sign(stops - current).astype(np.int8) + 1  # index into STOP_STATUSES
+
+        elapsed = self.stop_minutes.astype(np.int32) - self.stop_minutes[current]
+        delay = propagate_delay(self.delays[self.stop_train].astype(np.int32), elapsed,
+                                self.recovery_per_hour)
+        remaining = self.stop_status > 0
+        self.predicted_delay = np.where(remaining, delay, -1).astype(np.int16)
+        self.eta = np.where(remaining, self.stop_minutes + delay, self.stop_minutes).astype(np.int32)
+
+    def _stop(self, stop):
+        delay = int(self.predicted_delay[stop])
+        return {
+            "predicted_time": format_minutes(self.eta[stop]) if delay >= 0 else None,
+            "predicted_delay": delay if delay >= 0 else None
+        }
+
+    def train_predictions(self, train_id):
+        """Route of a train with predicted times, and its predicted arrival; None if unknown"""
+        i = self.index.get(train_id)
+        if i is None:
+            return None
+        start, end = self.stop_offsets[i], self.stop_offsets[i + 1]
+        route = [dict(route_stop, **self._stop(stop))
+                 for stop, route_stop in zip(range(start, end), self.trains[i]['route'])]
+        return {
+            "route": route,
+            "predicted_arrival": route[-1]['predicted_time'] if route else None
+        }
+
+    def lookup_station(self, name):
+        """Station code for a name (case-insensitive), or None"""
+        code = self.station_codes.get(name)
+        if code is None:
+            lowered = name.lower()
+            code = next((c for station, c in self.station_codes.items()
+                         if station.lower() == lowered), None)
+        return code
+
+    def departures(self, code, limit=20):
+        """Trains yet to leave a station, by predicted departure; returns (total, board)"""
+        stops = self.station_stops[self.station_offsets[code]:self.station_offsets[code + 1]]
+        stops = stops[(self.stop_status[stops] > 0) & ~self.is_terminal[stops]]
+        stops = stops[np.argsort(self.eta[stops], kind='stable')]
+
+        board = []
+        for stop in stops[:limit].tolist():
+            train = self.trains[self.stop_train[stop]]
+            board.append({
+                "train_id": train['id'],
+                "name": train['name'],
+                "type": train['type'],
+                "destination": train['to_station'],
+                "scheduled_time": format_minutes(self.stop_minutes[stop]),
+                "status": STOP_STATUSES[self.stop_status[stop]],
+                **self._stop(stop)
+            })
+        return len(stops), board
@@ -0,0 +1,112 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from sys import intern
+
+
+class _Record(Mapping):
+    """Read-only mapping interface over a dataclass
+
+    Records index like the train dicts they replace (`train['route']`,
+    `train.get('speed', 0)`, `dict(train)`), so consumers work the same on
+    records and on plain dicts read back from a cache file. The instance
+    dict holds exactly the fields, in order, so lookups go straight to it.
+    """
+
+    __slots__ = ()
+    _field_names = ()
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+    def __contains__(self, key):
+        return key in self.__dict__
+
+    def __iter__(self):
+        return iter(self.__dict__)
+
+    def __len__(self):
+        return len(self.__dict__)
+
+    def to_dict(self):
+        """Shallow dict of the fields; serializers convert nested records the same way"""
+        return self.__dict__.copy()
+
+
+def _record(cls):
+    # Not slotted: orjson serializes dataclasses through their __dict__ about
+    # as fast as dicts, but slotted ones several times slower
+    cls = dataclass(cls)
+    cls._field_names = tuple(field.name for field in fields(cls))
+    return cls
+
+
+@_record
+class Position(_Record):
+    lat: float
+    lng: float
+
+
+@_record
+class Stop(_Record):
+    station: str
+    time: str
+    status: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(intern(data['station']), intern(data['time']), intern(data['status']))
+
+
+@_record
+class TrainRecord(_Record):
+    """One train of a snapshot
+
+    Station names, times and statuses are interned, so the thousands of
+    trains stopping at a station share one string. Snapshots share the
+    (immutable) route tuple of trains whose stops did not change, and
+    records are never modified after they are published.
+    """
+
+    id: str
+    name: str
+    type: str
+    from_station: str
+    to_station: str
+    departure_time: str
+    arrival_time: str
+    current_station: str
+    delay_minutes: int
+    status: str
+    position: Position
+    route: tuple
+
+    @classmethod
+    def from_dict(cls, data):
+        """Record of a train dict, the kind MOCK_TRAINS and cache files hold"""
+        if isinstance(data, cls):
+            return data
+        if 'speed' in data and cls is TrainRecord:
+            return LiveTrainRecord.from_dict(data)
+        values = {name: data[name] for name in cls._field_names if name in data}
+        for name in ('type', 'from_station', 'to_station', 'departure_time', 'arrival_time',
+                     'current_station', 'status'):
+            values[name] = intern(values[name])
+        values['position'] = Position(data['position']['lat'], data['position']['lng'])
+        values['route'] = tuple(Stop.from_dict(stop) for stop in data['route'])
+        return cls(**values)
+
+    def moved(self, position, delay_minutes):
+        """Copy of the record at a new position and delay, sharing everything else"""
+        # Through __init__, so the copy keeps the compact shared-key instance dict
+        values = self.__dict__.copy()
+        values['position'] = position
+        values['delay_minutes'] = delay_minutes
+        return type(self)(**values)
+
+
+@_record
+class LiveTrainRecord(TrainRecord):
+    """Train from the live feed, which also reports speed (km/h) and heading"""
+
+    speed: int = 0
+    heading: int = 0
@@ -0,0 +1,145 @@
+import base64
+import json
+from bisect import bisect_right
+from collections import defaultdict
+
+STATION_FIELDS = ('from_station', 'to_station', 'current_station')
+
+# Sort orders of paginated train lists; every key ends with the unique id
+SORT_KEYS = {
+    'id': lambda train: train['id'],
+    'delay': lambda train: (-train['delay_minutes'], train['id']),  # most delayed first
+}
+
+
+def encode_cursor(sort, key):
+    """Opaque pagination cursor resuming after the train with sort key `key`"""
+    return base64.urlsafe_b64encode(json.dumps([sort, key]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Sort key of a cursor made for `sort`; raises ValueError if it is not one"""
+    try:
+        cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("malformed cursor") from e
+    if cursor_sort != sort:
+        raise ValueError("cursor was made for another sort order")
+    if sort == 'delay':
+        valid = (isinstance(key, list) and len(key) == 2 and type(key[0]) is int
+                 and isinstance(key[1], str))
+        key = tuple(key) if valid else key
+    else:
+        # Without a sort order the key is the offset into the list
+        valid = isinstance(key, str) if sort == 'id' else type(key) is int
+    if not valid:
+        raise ValueError("malformed cursor")
+    return key
+
+
+def paginate(trains, keys, after, limit):
+    """Up to `limit` trains following sort key `after`; returns (page, key of its last train or None)
+
+    `keys` are the sort keys of `trains`, in order; None stands for the
+    offsets, i.e. the list order.
+    """
+    if keys is None:
+        keys = range(len(trains))
+    start = bisect_right(keys, after) if after is not None else 0
+    end = start + limit
+    return trains[start:end], keys[end - 1] if end < len(trains) else None
+
+
+def project(trains, fields):
+    """Trains reduced to the given fields; all fields when `fields` is None"""
+    if fields is None:
+        return trains
+    return [{field: train[field] for field in fields if field in train} for train in trains]
+
+
+class TrainStore:
+    """Indexed, read-only view over one trains snapshot
+
+    Built once per refresh of the trains cache. Trains are referenced by their
+    position in the snapshot list, so filter results keep the snapshot order.
+    """
+
+    def __init__(self, trains):
+        self.trains = trains
+        self.by_id = {}
+        self.station_index = defaultdict(set)  # lowercased station -> positions
+        self.type_index = defaultdict(set)     # lowercased type -> positions
+        self.status_index = defaultdict(set)   # status -> positions
+        self._match_cache = {}
+        self._sorted = {}  # sort order -> (sort keys, trains)
+
+        for pos, train in enumerate(trains):
+            self.by_id[train['id']] = train
+            for field in STATION_FIELDS:
+                self.station_index[train[field].lower()].add(pos)
+            self.type_index[train['type'].lower()].add(pos)
+            self.status_index[train['status']].add(pos)
+
+    @classmethod
+    def from_cache(cls, cache_data):
+        return cls(cache_data['data'])
+
+    def __len__(self):
+        return len(self.trains)
+
+    def get(self, train_id):
+        """Get a train by id, or None"""
+        return self.by_id.get(train_id)
+
+    def _match(self, index_name, needle):
+        """Union of positions whose index key contains `needle`
+
+        Scans only the distinct keys of the index (stations, types), which is
+        far smaller than the fleet; results are memoized per snapshot.
+        """
+        cache_key = (index_name, needle)
+        positions = self._match_cache.get(cache_key)
+        if positions is None:
+            index = getattr(self, index_name)
+            positions = set()
+            for key, key_positions in index.items():
+                if needle in key:
+                    positions |= key_positions
+            if len(self._match_cache) > 1024:
+                self._match_cache.clear()
+            self._match_cache[cache_key] = positions
+        return positions
+
+    def filter(self, station=None, train_type=None, status=None):
+        """Trains matching all given filters, by index intersection
+
+        `station` and `train_type` are case-insensitive substring matches,
+        `status` is an exact match, as in the original list filters.
+        """
+        candidates = []
+        if station:
+            candidates.append(self._match('station_index', station.lower()))
+        if train_type:
+            candidates.append(self._match('type_index', train_type.lower()))
+        if status:
+            candidates.append(self.status_index.get(status, set()))
+
+        if not candidates:
+            return self.trains
+
+        candidates.sort(key=len)
+        result = candidates[0].intersection(*candidates[1:])
+        return [self.trains[pos] for pos in sorted(result)]
+
+    def sorted_by(self, sort):
+        """(sort keys, trains) of the whole snapshot in a SORT_KEYS order, built once"""
+        view = self._sorted.get(sort)
+        if view is None:
+            key = SORT_KEYS[sort]
+            trains = sorted(self.trains, key=key)
+            view = self._sorted.setdefault(sort, ([key(train) for train in trains], trains))
+        return view
+
+    def count(self, status):
+        """Number of trains with the given status"""
+        return len(self.status_index.get(status, ()))
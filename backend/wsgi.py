@@ -0,0 +1,67 @@
+"""Production entry point for multi-worker WSGI servers
+
+    gunicorn -w 4 -b 0.0.0.0:5000 'wsgi:create_app()'
+    waitress-serve --port=5000 --call wsgi:create_app
+
+Every worker serves requests from the shared cache files. Workers elect a
+leader with an flock in the cache directory: only the leader runs the
+refresh scheduler, the ingestion worker and the history writers, the others
+are read-only and learn about new snapshots through the snapshot channel
+(SNAPSHOT_CHANNEL: an mmap'd generation file by default, or a redis:// URL).
+
+Do not use gunicorn --preload: the election and its threads have to start
+in each worker process, after the fork.
+"""
+
+import logging
+import os
+
+import app as app_module
+from shared_snapshot import LeaderElection, SnapshotWatcher, create_channel
+
+logger = logging.getLogger(__name__)
+
+LEADER_RETRY_INTERVAL = 5  # seconds between followers' attempts to take over
+
+election = None
+watcher = None
+
+
+def on_snapshot_published(cache_type):
+    """Update this worker's indexes and stream subscribers from a published snapshot"""
+    if cache_type == 'trains':
+        cached_data, _ = app_module.load_trains()
+        app_module.observe_trains(cached_data)
+    elif cache_type == 'positions':
+        cached_positions, _ = app_module.load_positions()
+        app_module.observe_positions(cached_positions)
+
+
+def become_leader():
+    watcher.stop()
+    app_module.cache_manager.read_only = False
+    app_module.refresh_all_cache()
+    app_module.start_background_tasks()
+
+
+def create_app():
+    """Configure this worker for a shared-cache deployment and return the WSGI app"""
+    global election, watcher
+    if election is not None:
+        return app_module.app
+
+    cache_manager = app_module.cache_manager
+    cache_manager.channel = create_channel(os.environ.get('SNAPSHOT_CHANNEL'),
+                                           cache_manager.cache_dir, cache_manager.cache_files)
+    cache_manager.read_only = True
+
+    watcher = SnapshotWatcher(cache_manager.channel, ('trains', 'positions'), on_snapshot_published)
+    election = LeaderElection(os.path.join(cache_manager.cache_dir, 'refresh.lock'),
+                              become_leader, retry_interval=LEADER_RETRY_INTERVAL)
+    if election.try_acquire():
+        logger.info("👑 Worker %d elected to refresh data", os.getpid())
+        become_leader()
+    else:
+        watcher.start()
+        election.start()
+    return app_module.app
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { Train, Clock, AlertTriangle, CheckCircle, Map, Search } from 'lucide-react';
-import ApiService from '../services/api';
+import ApiService, { TRAIN_SUMMARY_FIELDS } from '../services/api';
 
 function Dashboard() {
   const [status, setStatus] = useState(null);
@@ -11,8 +11,9 @@ function Dashboard() {
 
   useEffect(() => {
     loadDashboardData();
-    const interval = setInterval(loadDashboardData, 30000); // Update every 30 seconds
-    return () => clearInterval(interval);
+    // Reload once per trains snapshot; position updates do not change the dashboard
+    const unsubscribe = ApiService.subscribeTrains(loadDashboardData);
+    return unsubscribe;
   }, []);
 
   const loadDashboardData = async () => {
@@ -20,7 +21,7 @@ function Dashboard() {
       setLoading(true);
       const [statusData, trainsData] = await Promise.all([
         ApiService.getSystemStatus(),
-        ApiService.getTrains()
+        ApiService.getTrains({ limit: 3, fields: TRAIN_SUMMARY_FIELDS })
       ]);
       
       if (statusData.success) {
@@ -28,7 +29,7 @@ function Dashboard() {
       }
       
       if (trainsData.success) {
-        setRecentTrains(trainsData.trains.slice(0, 3));
+        setRecentTrains(trainsData.trains);
       }
       
       setError(null);
@@ -12,8 +12,12 @@ function TrainDetails() {
 
   useEffect(() => {
     loadTrainData();
-    const interval = setInterval(loadPosition, 10000); // Update position every 10 seconds
-    return () => clearInterval(interval);
+    // Position updates for this train are pushed by the backend
+    const unsubscribe = ApiService.subscribePositions({ ids: [trainId] }, ({ updates }) => {
+      const update = updates.find(item => item.train_id === trainId);
+      if (update) setPosition(update);
+    }, loadPosition);
+    return unsubscribe;
   }, [trainId]);
 
   const loadTrainData = async () => {
@@ -252,6 +256,11 @@ function TrainDetails() {
                   color: '#666'
                 }}>
                   {stop.time}
+                  {stop.predicted_delay > 0 && (
+                    <span style={{ color: '#ef4444', marginLeft: '8px' }}>
+                      várható: {stop.predicted_time} (+{stop.predicted_delay} perc)
+                    </span>
+                  )}
                 </div>
               </div>
               
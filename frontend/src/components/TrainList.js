@@ -1,16 +1,21 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { Train, Filter, RefreshCw, MapPin, Clock } from 'lucide-react';
-import ApiService from '../services/api';
+import ApiService, { TRAIN_SUMMARY_FIELDS } from '../services/api';
+
+const PAGE_SIZE = 50;
 
 function TrainList() {
   const [trains, setTrains] = useState([]);
-  const [filteredTrains, setFilteredTrains] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [stations, setStations] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [lastUpdate, setLastUpdate] = useState(null);
   const [fromCache, setFromCache] = useState(false);
+  const [sort, setSort] = useState('');
   const [filters, setFilters] = useState({
     station: '',
     type: '',
@@ -18,31 +23,47 @@ function TrainList() {
   });
 
   useEffect(() => {
-    loadData();
+    loadStations();
   }, []);
 
+  // Filtering, sorting and paging happen on the server, a page at a time
   useEffect(() => {
-    applyFilters();
-  }, [trains, filters]);
+    loadData();
+  }, [filters, sort]);
+
+  const pageParams = (cursor) => {
+    const params = { limit: PAGE_SIZE, fields: TRAIN_SUMMARY_FIELDS };
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) params[key] = value;
+    });
+    if (sort) params.sort = sort;
+    if (cursor) params.cursor = cursor;
+    return params;
+  };
+
+  const loadStations = async () => {
+    try {
+      const stationsData = await ApiService.getStations();
+      if (stationsData.success) {
+        setStations(stationsData.stations);
+      }
+    } catch (err) {
+      console.error('TrainList stations error:', err);
+    }
+  };
 
   const loadData = async () => {
     try {
-      setLoading(true);
-      const [trainsData, stationsData] = await Promise.all([
-        ApiService.getTrains(),
-        ApiService.getStations()
-      ]);
+      const trainsData = await ApiService.getTrains(pageParams());
       
       if (trainsData.success) {
         setTrains(trainsData.trains);
+        setTotal(trainsData.total);
+        setNextCursor(trainsData.next_cursor);
         setLastUpdate(trainsData.last_updated);
         setFromCache(trainsData.from_cache || false);
       }
       
-      if (stationsData.success) {
-        setStations(stationsData.stations);
-      }
-      
       setError(null);
     } catch (err) {
       setError('Hiba történt az adatok betöltésekor');
@@ -52,28 +73,21 @@ function TrainList() {
     }
   };
 
-  const applyFilters = () => {
-    let filtered = [...trains];
-
-    if (filters.station) {
-      filtered = filtered.filter(train => 
-        train.from_station.toLowerCase().includes(filters.station.toLowerCase()) ||
-        train.to_station.toLowerCase().includes(filters.station.toLowerCase()) ||
-        train.current_station.toLowerCase().includes(filters.station.toLowerCase())
-      );
-    }
-
-    if (filters.type) {
-      filtered = filtered.filter(train => 
-        train.type.toLowerCase().includes(filters.type.toLowerCase())
-      );
-    }
-
-    if (filters.status) {
-      filtered = filtered.filter(train => train.status === filters.status);
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const trainsData = await ApiService.getTrains(pageParams(nextCursor));
+      
+      if (trainsData.success) {
+        setTrains(prev => [...prev, ...trainsData.trains]);
+        setTotal(trainsData.total);
+        setNextCursor(trainsData.next_cursor);
+      }
+    } catch (err) {
+      console.error('TrainList load more error:', err);
+    } finally {
+      setLoadingMore(false);
     }
-
-    setFilteredTrains(filtered);
   };
 
   const handleFilterChange = (key, value) => {
@@ -102,7 +116,7 @@ function TrainList() {
         <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '24px' }}>
           <h2 style={{ margin: 0, display: 'flex', alignItems: 'center', gap: '12px' }}>
             <Train size={24} />
-            Vonatok ({filteredTrains.length})
+            Vonatok ({total})
           </h2>
           <button 
             className="button" 
@@ -174,12 +188,27 @@ function TrainList() {
                 <option value="delayed">Késésben</option>
               </select>
             </div>
+            
+            <div>
+              <label style={{ display: 'block', marginBottom: '8px', fontWeight: 'bold' }}>
+                Rendezés
+              </label>
+              <select
+                className="input"
+                value={sort}
+                onChange={(e) => setSort(e.target.value)}
+              >
+                <option value="">Alapértelmezett</option>
+                <option value="id">Vonatszám</option>
+                <option value="delay">Késés szerint</option>
+              </select>
+            </div>
           </div>
         </div>
 
         {/* Train List */}
         <div className="grid grid-2">
-          {filteredTrains.map(train => (
+          {trains.map(train => (
             <Link 
               key={train.id} 
               to={`/trains/${train.id}`}
@@ -289,7 +318,19 @@ function TrainList() {
           ))}
         </div>
 
-        {filteredTrains.length === 0 && !loading && (
+        {nextCursor && (
+          <div style={{ textAlign: 'center', marginTop: '20px' }}>
+            <button 
+              className="button secondary" 
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Betöltés...' : `Továbbiak betöltése (${trains.length} / ${total})`}
+            </button>
+          </div>
+        )}
+
+        {trains.length === 0 && !loading && (
           <div style={{ 
             textAlign: 'center', 
             padding: '40px',
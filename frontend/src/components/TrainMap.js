@@ -1,7 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Link } from 'react-router-dom';
-import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
-import { Map, Train, RefreshCw, Info } from 'lucide-react';
+import { MapContainer, TileLayer, Marker, Popup, CircleMarker, Tooltip, useMapEvents } from 'react-leaflet';
+import { Map as MapIcon, Train, RefreshCw, Info } from 'lucide-react';
 import L from 'leaflet';
 import ApiService from '../services/api';
 
@@ -44,41 +44,176 @@ const delayedTrainIcon = new L.Icon({
   popupAnchor: [0, -16],
 });
 
+// Below this zoom level the backend returns clusters instead of trains
+const CLUSTER_MAX_ZOOM = 10;
+const CLUSTER_REFRESH_INTERVAL = 30000;
+
+// Visible bounds (rounded, so small pans reuse cached responses) and zoom
+const viewportOf = (map) => {
+  const bounds = map.getBounds();
+  const round = (value) => Math.round(value * 1000) / 1000;
+  return {
+    bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].map(round),
+    zoom: map.getZoom()
+  };
+};
+
+// Reports the viewport on mount and whenever the map stops moving
+function ViewportWatcher({ onChange }) {
+  const map = useMapEvents({
+    moveend: () => onChange(viewportOf(map))
+  });
+
+  useEffect(() => {
+    onChange(viewportOf(map));
+  }, [map]);
+
+  return null;
+}
+
 function TrainMap() {
   const [trains, setTrains] = useState([]);
+  const [clusters, setClusters] = useState([]);
+  const [viewport, setViewport] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedTrain, setSelectedTrain] = useState(null);
   const [lastUpdate, setLastUpdate] = useState(null);
+  const trainIds = useRef(new Set());
+  // Trains whose details are being fetched, so each is requested once
+  const pendingDetails = useRef(new Set());
+
+  useEffect(() => {
+    trainIds.current = new Set(trains.map(train => train.id));
+  }, [trains]);
 
   useEffect(() => {
+    if (!viewport) return undefined;
     loadTrains();
-    const interval = setInterval(loadTrains, 15000); // Update every 15 seconds
-    return () => clearInterval(interval);
-  }, []);
+
+    if (viewport.zoom < CLUSTER_MAX_ZOOM) {
+      // Clusters only change noticeably over several refreshes
+      const interval = setInterval(loadTrains, CLUSTER_REFRESH_INTERVAL);
+      return () => clearInterval(interval);
+    }
+    // Live positions of the visible trains are pushed by the backend
+    const unsubscribe = ApiService.subscribePositions({ bbox: viewport.bbox }, applyPositionUpdate, resyncPositions);
+    return unsubscribe;
+  }, [viewport]);
+
+  const applyPositionUpdate = ({ updates, removed }) => {
+    const byId = new Map(updates.map(update => [update.train_id, update]));
+    setTrains(current => {
+      const known = new Set(current.map(train => train.id));
+      const next = current
+        .filter(train => !removed.includes(train.id))
+        .map(train => {
+          const update = byId.get(train.id);
+          return update ? {
+            ...train,
+            realTimePosition: update.position,
+            current_station: update.current_station ?? train.current_station,
+            status: update.status,
+            delay_minutes: update.delay_minutes
+          } : train;
+        });
+      // Trains that just entered the viewport get a marker right away; their
+      // details (name, route...) are fetched separately
+      updates.filter(update => !known.has(update.train_id)).forEach(update => {
+        next.push({
+          id: update.train_id,
+          realTimePosition: update.position,
+          current_station: update.current_station,
+          status: update.status,
+          delay_minutes: update.delay_minutes
+        });
+      });
+      return next;
+    });
+
+    const entered = updates
+      .map(update => update.train_id)
+      .filter(id => !trainIds.current.has(id));
+    if (entered.length > 0) {
+      loadTrainDetails(entered);
+    }
+    if (updates.length > 0 && updates[0].timestamp) {
+      setLastUpdate(updates[0].timestamp);
+    }
+  };
+
+  // Fill in the details of trains added from position updates
+  const loadTrainDetails = async (ids) => {
+    const missing = ids.filter(id => !pendingDetails.current.has(id));
+    if (missing.length === 0) return;
+    missing.forEach(id => pendingDetails.current.add(id));
+    try {
+      const responses = await Promise.all(
+        missing.map(id => ApiService.getTrainDetails(id).catch(() => null))
+      );
+      const details = new Map(responses
+        .filter(response => response && response.success)
+        .map(response => [response.train.id, response.train]));
+      // Trains that left the viewport meanwhile stay out; the stream's
+      // position, status and delay are newer than the details
+      setTrains(current => current.map(train => {
+        const detail = details.get(train.id);
+        return detail ? {
+          ...detail,
+          ...train,
+          current_station: train.current_station ?? detail.current_station
+        } : train;
+      }));
+    } finally {
+      missing.forEach(id => pendingDetails.current.delete(id));
+    }
+  };
+
+  // Positions of every visible train in one request: the compact binary
+  // feed, or the JSON batch endpoint if that fails
+  const loadVisiblePositions = async () => {
+    try {
+      return (await ApiService.getPositionsBinary(viewport.bbox)).positions;
+    } catch (err) {
+      const response = await ApiService.getPositions({ bbox: viewport.bbox });
+      return Object.values(response.positions);
+    }
+  };
+
+  // Catch up after falling behind the stream with a fresh batch of positions
+  const resyncPositions = async () => {
+    if (!viewport) return;
+    try {
+      const positions = await loadVisiblePositions();
+      const visible = new Set(positions.map(position => position.train_id));
+      applyPositionUpdate({
+        updates: positions,
+        removed: [...trainIds.current].filter(id => !visible.has(id))
+      });
+    } catch (err) {
+      console.error('TrainMap resync error:', err);
+      await loadTrains();
+    }
+  };
 
   const loadTrains = async () => {
+    if (!viewport) return;
     try {
       setLoading(true);
-      const response = await ApiService.getTrains();
+      // Only the visible part of the fleet, clustered when zoomed out
+      const response = await ApiService.getTrainsInView(viewport.bbox, viewport.zoom);
       
       if (response.success) {
-        // Get positions for all trains
-        const trainsWithPositions = await Promise.all(
-          response.trains.map(async (train) => {
-            try {
-              const positionData = await ApiService.getTrainPosition(train.id);
-              return {
-                ...train,
-                realTimePosition: positionData.success ? positionData.position : train.position
-              };
-            } catch (err) {
-              console.error(`Error getting position for train ${train.id}:`, err);
-              return { ...train, realTimePosition: train.position };
-            }
-          })
-        );
-        setTrains(trainsWithPositions);
+        if (response.clustered) {
+          setClusters(response.clusters);
+          setTrains([]);
+        } else {
+          setClusters([]);
+          setTrains(response.trains.map(train => ({
+            ...train,
+            realTimePosition: train.position
+          })));
+        }
         setLastUpdate(response.last_updated);
       }
       
@@ -112,7 +247,7 @@ function TrainMap() {
       <div className="card">
         <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '20px' }}>
           <h2 style={{ margin: 0, display: 'flex', alignItems: 'center', gap: '12px' }}>
-            <Map size={24} />
+            <MapIcon size={24} />
             Vonatok Térképe
           </h2>
           <button 
@@ -168,91 +303,100 @@ function TrainMap() {
           overflow: 'hidden',
           border: '1px solid rgba(0, 0, 0, 0.1)'
         }}>
-          {loading ? (
-            <div className="loading" style={{ height: '100%' }}>
-              <div className="spinner"></div>
-            </div>
-          ) : (
-            <MapContainer 
-              center={mapCenter} 
-              zoom={mapZoom} 
-              style={{ height: '100%', width: '100%' }}
-            >
-              <TileLayer
-                url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
-                attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-              />
-              
-              {trains.map(train => (
-                <Marker
-                  key={train.id}
-                  position={[train.realTimePosition.lat, train.realTimePosition.lng]}
-                  icon={train.delay_minutes > 0 ? delayedTrainIcon : trainIcon}
-                  eventHandlers={{
-                    click: () => setSelectedTrain(train)
-                  }}
-                >
-                  <Popup>
-                    <div style={{ minWidth: '200px' }}>
+          {/* The map stays mounted while reloading, so the viewport is kept */}
+          <MapContainer 
+            center={mapCenter} 
+            zoom={mapZoom} 
+            style={{ height: '100%', width: '100%' }}
+          >
+            <TileLayer
+              url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+              attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+            />
+            <ViewportWatcher onChange={setViewport} />
+            
+            {clusters.map(cluster => (
+              <CircleMarker
+                key={`${cluster.lat},${cluster.lng}`}
+                center={[cluster.lat, cluster.lng]}
+                radius={Math.min(30, 10 + Math.sqrt(cluster.count) * 2)}
+                pathOptions={{ color: 'white', weight: 2, fillColor: '#667eea', fillOpacity: 0.85 }}
+              >
+                <Tooltip permanent direction="center" opacity={1}>
+                  {cluster.train_id || cluster.count}
+                </Tooltip>
+              </CircleMarker>
+            ))}
+            
+            {trains.map(train => (
+              <Marker
+                key={train.id}
+                position={[train.realTimePosition.lat, train.realTimePosition.lng]}
+                icon={train.delay_minutes > 0 ? delayedTrainIcon : trainIcon}
+                eventHandlers={{
+                  click: () => setSelectedTrain(train)
+                }}
+              >
+                <Popup>
+                  <div style={{ minWidth: '200px' }}>
+                    <div style={{ 
+                      display: 'flex', 
+                      justifyContent: 'space-between', 
+                      alignItems: 'center',
+                      marginBottom: '8px'
+                    }}>
+                      <strong style={{ color: '#667eea', fontSize: '1.1rem' }}>
+                        {train.id}
+                      </strong>
+                      <span className={`status-badge status-${train.status}`} style={{ fontSize: '0.7rem' }}>
+                        {train.status === 'running' ? 'Közlekedik' : 
+                         train.status === 'delayed' ? 'Késés' : train.status}
+                      </span>
+                    </div>
+                    
+                    <div style={{ marginBottom: '8px', fontWeight: '500' }}>
+                      {train.name}
+                    </div>
+                    
+                    <div style={{ fontSize: '0.9rem', marginBottom: '8px' }}>
+                      <strong>{train.from_station}</strong> → <strong>{train.to_station}</strong>
+                    </div>
+                    
+                    <div style={{ fontSize: '0.8rem', color: '#666', marginBottom: '8px' }}>
+                      Jelenleg: <strong>{train.current_station}</strong>
+                    </div>
+                    
+                    {train.delay_minutes > 0 && (
                       <div style={{ 
-                        display: 'flex', 
-                        justifyContent: 'space-between', 
-                        alignItems: 'center',
+                        fontSize: '0.8rem', 
+                        color: '#ef4444', 
+                        fontWeight: 'bold',
                         marginBottom: '8px'
                       }}>
-                        <strong style={{ color: '#667eea', fontSize: '1.1rem' }}>
-                          {train.id}
-                        </strong>
-                        <span className={`status-badge status-${train.status}`} style={{ fontSize: '0.7rem' }}>
-                          {train.status === 'running' ? 'Közlekedik' : 
-                           train.status === 'delayed' ? 'Késés' : train.status}
-                        </span>
-                      </div>
-                      
-                      <div style={{ marginBottom: '8px', fontWeight: '500' }}>
-                        {train.name}
+                        +{train.delay_minutes} perc késés
                       </div>
-                      
-                      <div style={{ fontSize: '0.9rem', marginBottom: '8px' }}>
-                        <strong>{train.from_station}</strong> → <strong>{train.to_station}</strong>
-                      </div>
-                      
-                      <div style={{ fontSize: '0.8rem', color: '#666', marginBottom: '8px' }}>
-                        Jelenleg: <strong>{train.current_station}</strong>
-                      </div>
-                      
-                      {train.delay_minutes > 0 && (
-                        <div style={{ 
-                          fontSize: '0.8rem', 
-                          color: '#ef4444', 
-                          fontWeight: 'bold',
-                          marginBottom: '8px'
-                        }}>
-                          +{train.delay_minutes} perc késés
-                        </div>
-                      )}
-                      
-                      <Link 
-                        to={`/trains/${train.id}`}
-                        style={{ 
-                          display: 'inline-block',
-                          padding: '6px 12px',
-                          background: '#667eea',
-                          color: 'white',
-                          textDecoration: 'none',
-                          borderRadius: '4px',
-                          fontSize: '0.8rem',
-                          fontWeight: 'bold'
-                        }}
-                      >
-                        Részletek
-                      </Link>
-                    </div>
-                  </Popup>
-                </Marker>
-              ))}
-            </MapContainer>
-          )}
+                    )}
+                    
+                    <Link 
+                      to={`/trains/${train.id}`}
+                      style={{ 
+                        display: 'inline-block',
+                        padding: '6px 12px',
+                        background: '#667eea',
+                        color: 'white',
+                        textDecoration: 'none',
+                        borderRadius: '4px',
+                        fontSize: '0.8rem',
+                        fontWeight: 'bold'
+                      }}
+                    >
+                      Részletek
+                    </Link>
+                  </div>
+                </Popup>
+              </Marker>
+            ))}
+          </MapContainer>
         </div>
       </div>
 
@@ -262,6 +406,12 @@ function TrainMap() {
           Vonatok Listája ({trains.length})
         </h3>
         
+        {clusters.length > 0 && (
+          <div style={{ fontSize: '0.9rem', color: '#666', marginBottom: '12px' }}>
+            {clusters.reduce((total, cluster) => total + cluster.count, 0)} vonat a térképen – nagyíts rá a listához
+          </div>
+        )}
+        
         <div style={{ 
           display: 'grid', 
           gap: '12px',
@@ -381,7 +531,7 @@ function TrainMap() {
                 background: '#10b981',
                 animation: 'pulse 2s infinite'
               }}></div>
-              <span>Automatikus frissítés: 15mp</span>
+              <span>Élő frissítés</span>
             </div>
           </div>
         </div>
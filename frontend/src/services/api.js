@@ -2,6 +2,21 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// Train fields shown on summary cards; requesting only these leaves out the routes
+export const TRAIN_SUMMARY_FIELDS = [
+  'id', 'name', 'type', 'status', 'from_station', 'to_station', 'current_station',
+  'departure_time', 'arrival_time', 'delay_minutes'
+].join(',');
+
+// Binary position feed (/api/positions.bin, see backend/position_feed.py):
+// a 16-byte header (magic 'TPF1', uint32 record count, 8-byte id dictionary
+// key) and 15-byte little-endian records: int32 index into the id
+// dictionary, float32 lat, float32 lng, int16 delay minutes, uint8 status
+const POSITION_FEED_MAGIC = 'TPF1';
+const POSITION_FEED_HEADER_SIZE = 16;
+const POSITION_RECORD_SIZE = 15;
+const POSITION_STATUSES = ['running', 'delayed'];
+
 class ApiService {
   constructor() {
     this.client = axios.create({
@@ -11,9 +26,93 @@ class ApiService {
         'Content-Type': 'application/json',
       }
     });
+
+    // Train ids of the binary position feed: { key, ids }
+    this.positionIds = null;
+  }
+
+  // Decode a binary position feed body; ids are resolved later, by index
+  decodePositionFeed(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== POSITION_FEED_MAGIC) {
+      throw new Error(`Unknown position feed format: ${magic}`);
+    }
+    const count = view.getUint32(4, true);
+    const key = Array.from(new Uint8Array(buffer, 8, 8), byte => byte.toString(16).padStart(2, '0')).join('');
+
+    const records = new Array(count);
+    for (let i = 0, offset = POSITION_FEED_HEADER_SIZE; i < count; i++, offset += POSITION_RECORD_SIZE) {
+      const status = view.getUint8(offset + 14);
+      records[i] = {
+        index: view.getInt32(offset, true),
+        position: { lat: view.getFloat32(offset + 4, true), lng: view.getFloat32(offset + 8, true) },
+        delay_minutes: view.getInt16(offset + 12, true),
+        status: POSITION_STATUSES[status] || 'unknown'
+      };
+    }
+    return { key, records };
+  }
+
+  // Get positions of many trains in one request
+  // options: { ids: ['IC001', ...], bbox: [west, south, east, north] }
+  async getPositions({ ids, bbox } = {}) {
+    try {
+      const params = {};
+      if (ids && ids.length) params.ids = ids.join(',');
+      if (bbox) params.bbox = bbox.join(',');
+      const response = await this.client.get('/positions', { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching positions:', error);
+      throw error;
+    }
+  }
+
+  // Get the position changes since a version of the unfiltered snapshot:
+  // { full: false, version, added, changed, removed }, or the whole snapshot
+  // ({ full: true, positions }) when the backend no longer has that version
+  async getPositionChanges(since) {
+    try {
+      const response = await this.client.get('/positions', { params: { since } });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching position changes:', error);
+      throw error;
+    }
+  }
+
+  // Get positions (optionally only inside bbox [west, south, east, north])
+  // from the compact binary feed: id, coordinates, delay and status only
+  async getPositionsBinary(bbox) {
+    try {
+      const params = bbox ? { bbox: bbox.join(',') } : {};
+      const response = await this.client.get('/positions.bin', { params, responseType: 'arraybuffer' });
+      const { key, records } = this.decodePositionFeed(response.data);
+
+      // The id dictionary only changes when trains come or go
+      if (!this.positionIds || this.positionIds.key !== key) {
+        const ids = (await this.client.get('/positions.ids')).data;
+        this.positionIds = { key: ids.key, ids: ids.ids };
+        if (ids.key !== key) {
+          // The snapshot changed in between; fetch it again to match the new dictionary
+          return this.getPositionsBinary(bbox);
+        }
+      }
+
+      const ids = this.positionIds.ids;
+      const positions = records.map(({ index, ...record }) => ({ train_id: ids[index], ...record }));
+      return { success: true, positions, count: positions.length };
+    } catch (error) {
+      console.error('Error fetching binary positions:', error);
+      throw error;
+    }
   }
 
-  // Get all trains with optional filters
+  // Get trains with optional filters (station, type, status)
+  // Paging: { limit, sort: 'id' | 'delay', cursor } returns `total` and a
+  // `next_cursor` for the following page (null on the last one);
+  // `fields` (comma-separated) leaves out the other fields
   async getTrains(filters = {}) {
     try {
       const response = await this.client.get('/trains', { params: filters });
@@ -24,6 +123,30 @@ class ApiService {
     }
   }
 
+  // Get the trains inside a map viewport
+  // bbox: [west, south, east, north]; below zoom 10 the backend answers with
+  // { clustered: true, clusters: [{ lat, lng, count, train_id? }] } instead of trains
+  async getTrainsInView(bbox, zoom) {
+    try {
+      const response = await this.client.get('/trains', { params: { bbox: bbox.join(','), zoom } });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching trains in view:', error);
+      throw error;
+    }
+  }
+
+  // Get the trains within radiusKm of a point, nearest first
+  async getNearbyTrains(lat, lng, radiusKm = 10) {
+    try {
+      const response = await this.client.get('/trains/nearby', { params: { lat, lng, radius: radiusKm } });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching nearby trains:', error);
+      throw error;
+    }
+  }
+
   // Get specific train details
   async getTrainDetails(trainId) {
     try {
@@ -46,6 +169,83 @@ class ApiService {
     }
   }
 
+  // Subscribe to live position and delay updates (Server-Sent Events)
+  // options: { ids: ['IC001', ...], bbox: [west, south, east, north] }
+  // onUpdate receives { type: 'snapshot' | 'positions' | 'delta', version, updates, removed }.
+  // When the client falls behind the stream it catches up with the changes
+  // since the last version it saw (a 'delta' update); onResync is only
+  // called when those are no longer available and it should reload.
+  // Returns a function that closes the stream.
+  subscribePositions({ ids, bbox } = {}, onUpdate, onResync = () => {}) {
+    const params = new URLSearchParams();
+    if (ids && ids.length) params.set('ids', ids.join(','));
+    if (bbox) params.set('bbox', bbox.join(','));
+    const query = params.toString();
+    const source = new EventSource(`${API_BASE_URL}/stream${query ? `?${query}` : ''}`);
+    let version = null;
+
+    const handle = (type) => (event) => {
+      const data = JSON.parse(event.data);
+      version = data.version;
+      onUpdate({ type, removed: [], ...data });
+    };
+    const catchUp = async () => {
+      if (!version) return onResync();
+      try {
+        const delta = await this.getPositionChanges(version);
+        if (!delta.success || delta.full) return onResync();
+        version = delta.version;
+        onUpdate({ type: 'delta', version, ...this.filterPositionChanges(delta, { ids, bbox }) });
+      } catch (error) {
+        onResync();
+      }
+    };
+    source.addEventListener('snapshot', handle('snapshot'));
+    source.addEventListener('positions', handle('positions'));
+    source.addEventListener('resync', catchUp);
+    source.onerror = (error) => {
+      // EventSource reconnects on its own; the next snapshot event catches up
+      console.error('Position stream error:', error);
+    };
+
+    return () => source.close();
+  }
+
+  // Narrow an unfiltered position delta to a subscription's ids and bbox:
+  // trains that moved out of the bbox count as removed
+  filterPositionChanges({ added, changed, removed }, { ids, bbox } = {}) {
+    const wanted = ids && ids.length ? new Set(ids) : null;
+    const inside = ({ position }) => !bbox || (
+      position.lng >= bbox[0] && position.lat >= bbox[1] &&
+      position.lng <= bbox[2] && position.lat <= bbox[3]);
+
+    const updates = [];
+    const gone = removed.filter(id => !wanted || wanted.has(id));
+    [...Object.values(added), ...Object.values(changed)].forEach(position => {
+      if (wanted && !wanted.has(position.train_id)) return;
+      if (inside(position)) {
+        updates.push(position);
+      } else {
+        gone.push(position.train_id);
+      }
+    });
+    return { updates, removed: gone };
+  }
+
+  // Subscribe to new trains snapshots (Server-Sent Events): onChange
+  // receives { version } once per trains refresh, and {} when the client fell
+  // behind. Returns a function that closes the stream.
+  subscribeTrains(onChange) {
+    const source = new EventSource(`${API_BASE_URL}/stream?events=trains`);
+    source.addEventListener('trains', (event) => onChange(JSON.parse(event.data)));
+    source.addEventListener('resync', () => onChange({}));
+    source.onerror = (error) => {
+      console.error('Trains stream error:', error);
+    };
+
+    return () => source.close();
+  }
+
   // Get all stations
   async getStations() {
     try {
@@ -57,10 +257,38 @@ class ApiService {
     }
   }
 
-  // Search trains
-  async searchTrains(query) {
+  // Departure board of a station: trains yet to leave it, by predicted time
+  async getStationDepartures(station, limit = 20) {
+    try {
+      const response = await this.client.get(`/stations/${encodeURIComponent(station)}/departures`, {
+        params: { limit }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching departures:', error);
+      throw error;
+    }
+  }
+
+  // Trains expected at a station in the next `window` minutes
+  // options: { window: 60, kind: 'arrivals' | 'departures', time: 'HH:MM' }
+  async getStationBoard(station, { window = 60, kind, time } = {}) {
+    try {
+      const params = { window };
+      if (kind) params.kind = kind;
+      if (time) params.time = time;
+      const response = await this.client.get(`/stations/${encodeURIComponent(station)}/board`, { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching station board:', error);
+      throw error;
+    }
+  }
+
+  // Search trains (results are ranked, best match first)
+  async searchTrains(query, limit = 50) {
     try {
-      const response = await this.client.get('/search', { params: { q: query } });
+      const response = await this.client.get('/search', { params: { q: query, limit } });
       return response.data;
     } catch (error) {
       console.error('Error searching trains:', error);